@@ -0,0 +1,24 @@
+'''This script benchmarks importing, converting and analysing synthetic Wordle emails'''
+
+# Import necessary libraries
+import benchmarkmodule
+
+# Number of messages in each synthetic mailbox
+CORPUS_SIZES = [1000, 10000, 50000]
+
+# Size of the synthetic Wordle group
+NUM_PLAYERS = 8
+NUM_PUZZLES = 1000
+
+# Number of worker processes for the parallel import (None = one per CPU)
+NUM_WORKERS = None
+
+# Where the synthetic mailboxes, their ground truth and the results are saved
+BENCHMARK_DIR = 'Data/Benchmark'
+
+if __name__ == '__main__':
+
+  results = benchmarkmodule.run_benchmarks(CORPUS_SIZES, BENCHMARK_DIR, NUM_PLAYERS, NUM_PUZZLES, workers=NUM_WORKERS)
+  print(results.to_string())
+
+  results.to_csv(BENCHMARK_DIR + '/Benchmark results.csv', index=False)
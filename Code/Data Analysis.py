@@ -1,14 +1,16 @@
-import pickle
 import numpy as np
 import matplotlib.pyplot as plt
 import wordlemodule
 
-# Open pickle file
-with open('Data/Script data/Imported_email_data_with_ints.pkl','rb') as file:
-    full_data = pickle.load(file)
+# Convert a pickle file from an older version of 'Convert emails to ints.py'
+#wordlemodule.convert_pickle('Data/Script data/Imported_email_data_with_ints.pkl', 'Data/Script data/Imported_email_data.wordle')
 
-# Create custom wordle object with input data
-data = wordlemodule.WordleData(full_data)
+# Create custom wordle object from the store file
+data = wordlemodule.WordleData('Data/Script data/Imported_email_data.wordle')
+
+# Or import the mbox file directly, without the import and convert scripts
+#import emailmodule
+#data = emailmodule.load_wordle_data('Data/Wordle emails/Wordle.mbox')
 #df = data.linear_reg()
 #df1,df2,df3 = data.weekly()
 #df = data.rolling(20)
@@ -16,3 +18,6 @@ data = wordlemodule.WordleData(full_data)
 #dt = data.puzz_avg()
 patterns, patterns_freq = data.letter_patterns()
 wordlemodule.int_to_char(patterns[:,:,1],freq=patterns_freq[:,:,1])
+
+# Or render the top patterns of every guess as a markdown table
+#print(wordlemodule.grids_table(patterns.transpose(2,0,1).reshape(-1,5).T[None], freq=patterns_freq.transpose(2,0,1).ravel()))
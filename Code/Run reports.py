@@ -0,0 +1,34 @@
+'''This script runs every standard analysis in one batch and saves the results as tables'''
+
+# Import necessary libraries
+import reportmodule
+from metricsmodule import Metrics
+
+# Store file of the Wordle group (saved by 'Convert emails to ints.py')
+STORE_DIR = 'Data/Script data/Imported_email_data.wordle'
+
+# Or the store files of several groups, {group name: store file}, run by a pool of worker processes
+GROUPS = None
+
+# Reports to run (None = all of reportmodule.REPORTS) and the file formats to save them in
+REPORTS = None
+FORMATS = ['csv', 'json']
+
+# Number of threads running the analyses of each group, and of worker processes (None = one per CPU)
+NUM_THREADS = 4
+NUM_WORKERS = None
+
+# Where the tables are saved (one sub-directory per group)
+REPORT_DIR = 'Data/Reports'
+
+if __name__ == '__main__':
+
+  if GROUPS is None:
+    metrics = Metrics()
+    tables = reportmodule.run_report(STORE_DIR, REPORT_DIR, REPORTS, FORMATS, NUM_THREADS, metrics)
+    print('Saved', len(tables), 'tables to', REPORT_DIR)
+    for stage, totals in metrics.as_dict()['stages'].items():
+      print(f"{stage}: {totals['seconds']:.3f} s")
+  else:
+    results = reportmodule.run_group_reports(GROUPS, REPORT_DIR, REPORTS, FORMATS, NUM_WORKERS, NUM_THREADS)
+    print(results.to_string())
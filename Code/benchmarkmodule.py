@@ -0,0 +1,374 @@
+'''Synthetic Wordle email corpora, and benchmarks of the import, convert and analysis stages on them'''
+
+# Import necessary libraries
+from os import cpu_count, devnull, makedirs, path
+from contextlib import redirect_stdout
+from datetime import datetime, timedelta
+from email.charset import Charset, QP
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from email.utils import format_datetime, parseaddr
+import json
+import random
+import time
+import tracemalloc
+
+import pandas as pd
+
+import emailmodule
+from metricsmodule import Metrics
+from wordlemodule import PuzzleStore, WordleData, decode_grids, pack_grids
+
+# Date of puzzle 0, used to date the synthetic emails
+PUZZLE_0_DATETIME = datetime(2021, 6, 19, 8, 0)
+
+# Wordle result boxes
+GREY, YELLOW, GREEN = chr(11036), chr(129000), chr(129001)
+
+# Relative frequency of each way a Wordle result is encoded in the synthetic emails:
+# base64 text/plain (gmail), quoted-printable text/plain, Apple Mail (quoted-printable with an
+# Apple Mail X-Mailer header) and multipart/alternative with base64 text/plain and text/html parts
+ENCODING_MIX = {'base64': 0.4, 'quoted-printable': 0.15, 'apple-mail': 0.15, 'multipart': 0.3}
+
+# Messages that don't contain a Wordle result
+NOISE_MESSAGES = ['Anyone up for lunch on Sunday?',
+                  'That one was brutal, I had no idea.',
+                  'Happy birthday! See you at dinner.',
+                  'Did you see the news about the crossword?']
+
+# Fraction of messages without a Wordle result, fraction of results sent as a reply quoting another
+# player's result for the same puzzle, and fraction of the quoted results that are only in the
+# mailbox as a quote (their own email is missing)
+NOISE_RATE = 0.1
+REPLY_RATE = 0.25
+QUOTED_ONLY_RATE = 0.5
+
+
+def make_grid(rng):
+    '''
+    Makes a random Wordle result
+
+    Parameters:
+    rng (random.Random): random number generator
+
+    Returns:
+    (score, grid) tuple: the solve score string ('1'-'6' or 'X') and the rows of boxes, one per line
+    '''
+    num_rows = rng.choice([2, 3, 3, 4, 4, 4, 5, 5, 6, 7])
+    rows = []
+    for row in range(min(num_rows, 6)):
+        if row == num_rows - 1:
+            rows.append(GREEN*5)
+            continue
+        boxes = [rng.choice([GREY, GREY, YELLOW, GREEN]) for col in range(5)]
+        if boxes == [GREEN]*5:
+            boxes[rng.randrange(5)] = YELLOW
+        rows.append(''.join(boxes))
+    score = 'X' if num_rows == 7 else str(num_rows)
+    return score, '\r\n'.join(rows)
+
+
+def wordle_text(puzzle, score, grid):
+    '''Formats a Wordle result the way the share button does'''
+    return f'Wordle {puzzle:,} {score}/6\r\n\r\n{grid}'
+
+
+def quote_text(text, sender, sent):
+    '''Formats a reply's quote of an earlier message, as gmail does'''
+    quoted = '\r\n'.join('> ' + line if line else '>' for line in text.split('\r\n'))
+    return f'On {sent:%a, %b %d, %Y at %I:%M %p} {sender} wrote:\r\n\r\n{quoted}'
+
+
+def make_message(text, encoding):
+    '''
+    Builds an email message of text in one of the encodings of ENCODING_MIX
+
+    Returns:
+    email.message.Message without address headers
+    '''
+    if encoding == 'base64':
+        return MIMEText(text, 'plain', 'utf-8')
+
+    if encoding in ('quoted-printable', 'apple-mail'):
+        charset = Charset('utf-8')
+        charset.body_encoding = QP
+        message = MIMEText(text, 'plain', charset)
+        if encoding == 'apple-mail':
+            # Apple Mail sends quoted-printable bodies declared as 7bit
+            message.replace_header('Content-Transfer-Encoding', '7bit')
+            message['X-Mailer'] = 'Apple Mail (2.3731.700.6)'
+        return message
+
+    if encoding == 'multipart':
+        message = MIMEMultipart('alternative')
+        message.attach(MIMEText(text, 'plain', 'utf-8'))
+        html = '<div dir="ltr">' + text.replace('\r\n', '<br>') + '</div>'
+        message.attach(MIMEText(html, 'html', 'utf-8'))
+        return message
+
+    raise ValueError(f'Unknown encoding {encoding!r}')
+
+
+def generate_corpus(mbox_dir, eml_dir=None, num_players=6, num_puzzles=365, num_messages=1000,
+                    first_puzzle=200, seed=0):
+    '''
+    Writes a synthetic mailbox of Wordle result emails, and returns the results it contains
+
+    The emails mix the encodings of ENCODING_MIX, replies that quote another player's result for
+    the same puzzle (REPLY_RATE, some of which are only in the mailbox as a quote) and messages
+    without a Wordle result (NOISE_RATE). Messages are in date order, as in a downloaded mailbox.
+
+    Parameters:
+    mbox_dir (string): path of the mbox file to write
+    eml_dir (string): (optional) also write each message as a .eml file in this directory
+    num_players (int): number of players
+    num_puzzles (int): number of consecutive puzzles played
+    num_messages (int): number of messages (at most num_players * num_puzzles Wordle results are sent)
+    first_puzzle (int): number of the first puzzle
+    seed (int): random seed, the same arguments and seed always write the same corpus
+
+    Returns:
+    truth (dict): {email address: {puzzle: grid}} of every result in the mailbox, including quoted ones
+    quoted_only (list): [email address, puzzle] of the results that are only in the mailbox as a quote
+    '''
+    rng = random.Random(seed)
+    players = [(f'Player {i}', f'player{i}@example.com') for i in range(num_players)]
+    encodings, weights = list(ENCODING_MIX), list(ENCODING_MIX.values())
+
+    # Choose which player sends a result for which puzzle
+    num_results = min(round(num_messages * (1 - NOISE_RATE)), num_players * num_puzzles)
+    played = sorted(rng.sample(range(num_players * num_puzzles), num_results))
+    results = {}
+    for cell in played:
+        puzzle, player = first_puzzle + cell // num_players, cell % num_players
+        results[player, puzzle] = make_grid(rng)
+
+    # Each result is its own message, or a reply quoting an earlier result for the same puzzle
+    messages = []
+    quoted_only = set()
+    by_puzzle = {}
+    for player, puzzle in results:
+        by_puzzle.setdefault(puzzle, []).append(player)
+    for puzzle, puzzle_players in sorted(by_puzzle.items()):
+        sent = PUZZLE_0_DATETIME + timedelta(days=puzzle)
+        for player in puzzle_players:
+            sent += timedelta(minutes=rng.randint(1, 240))
+            text = wordle_text(puzzle, *results[player, puzzle])
+            quoted = None
+            if rng.random() < REPLY_RATE:
+                # Quote a player who hasn't played this puzzle yet, or one who already sent theirs
+                others = [other for other in range(num_players) if other != player
+                          and (other, puzzle) not in results and rng.random() < QUOTED_ONLY_RATE]
+                if others:
+                    quoted = rng.choice(others)
+                    results[quoted, puzzle] = make_grid(rng)
+                    quoted_only.add((quoted, puzzle))
+                else:
+                    earlier = puzzle_players[:puzzle_players.index(player)]
+                    quoted = rng.choice(earlier) if earlier else None
+            if quoted is not None:
+                quote_time = sent - timedelta(minutes=rng.randint(1, 60))
+                sender = f'{players[quoted][0]} <{players[quoted][1]}>'
+                text += '\r\n\r\n' + quote_text(wordle_text(puzzle, *results[quoted, puzzle]), sender, quote_time)
+            messages.append((sent, player, text, quoted is not None))
+
+    # Spread the noise messages over the same dates
+    num_noise = max(num_messages - len(messages), 0)
+    for i in range(num_noise):
+        sent = PUZZLE_0_DATETIME + timedelta(days=first_puzzle + rng.randrange(num_puzzles),
+                                             minutes=rng.randint(1, 1000))
+        messages.append((sent, rng.randrange(num_players), rng.choice(NOISE_MESSAGES), False))
+    messages.sort(key=lambda item: item[0])
+
+    if eml_dir is not None:
+        makedirs(eml_dir, exist_ok=True)
+    with open(mbox_dir, 'wb') as mbox_file:
+        for idx, (sent, player, text, is_reply) in enumerate(messages):
+            message = make_message(text, rng.choices(encodings, weights)[0])
+            message['From'] = f'{players[player][0]} <{players[player][1]}>'
+            message['To'] = 'wordle-group@example.com'
+            message['Subject'] = ('Re: ' if is_reply else '') + 'Wordle'
+            message['Date'] = format_datetime(sent)
+            message['Message-ID'] = f'<{seed}.{idx}@example.com>'
+            if is_reply:
+                message['In-Reply-To'] = f'<{seed}.reply{idx}@example.com>'
+            raw = message.as_bytes()
+
+            mbox_file.write(f'From {players[player][1]} {sent:%a %b %d %H:%M:%S %Y}\n'.encode('ascii'))
+            mbox_file.write(raw + b'\n\n')
+            if eml_dir is not None:
+                with open(path.join(eml_dir, f'{idx:06d}.eml'), 'wb') as eml_file:
+                    eml_file.write(raw)
+
+    truth = {}
+    for (player, puzzle), (score, grid) in sorted(results.items()):
+        truth.setdefault(players[player][1], {})[str(puzzle)] = grid
+    quoted_only = sorted([players[player][1], puzzle] for player, puzzle in quoted_only)
+    return truth, quoted_only
+
+
+def check_results(wordle_result_dict, truth, quoted_only=()):
+    '''
+    Compares imported results with the generator's ground truth. Senders are compared by
+    email address, puzzles by number and grids by their int representation.
+
+    Parameters:
+    wordle_result_dict (dict): {sender: {puzzle: grid}} from an importer
+    truth (dict): {email address: {puzzle: grid}} from generate_corpus
+    quoted_only (list): [email address, puzzle] of results only in the mailbox as a quote
+
+    Returns:
+    dict of counts: expected, imported, correct, wrong_grid, missing, missing_quoted_only, unexpected
+    '''
+    return compare_results(packed_results(wordle_result_dict), packed_results(truth), quoted_only)
+
+
+def check_store(store, truth, quoted_only=()):
+    '''
+    Compares the puzzles of a PuzzleStore (e.g. the store of a WordleData object streamed
+    from the mailbox) with the generator's ground truth, as check_results
+    '''
+    addresses = [parseaddr(player)[1].lower() or player for player in store.players]
+    keys = [(addresses[player], puzzle) for player, puzzle in zip(store.player_id.tolist(), store.puzzle_num.tolist())]
+    return compare_results(dict(zip(keys, store.grid)), packed_results(truth), quoted_only)
+
+
+def packed_results(result_dict):
+    '''{(email address, puzzle number): packed grid} of {sender: {puzzle: grid}} results'''
+    keys, grids = [], []
+    for sender, puzzles in result_dict.items():
+        address = parseaddr(sender)[1].lower() or sender
+        for puzzle, grid in puzzles.items():
+            keys.append((address, int(str(puzzle).replace(',', ''))))
+            grids.append(grid)
+    packed = pack_grids(decode_grids(grids)[0]) if grids else []
+    return dict(zip(keys, packed))
+
+
+def compare_results(imported, expected, quoted_only):
+    '''Counts for check_results of {(email address, puzzle number): packed grid} dicts'''
+    quoted_only = {(address, int(puzzle)) for address, puzzle in quoted_only}
+
+    found = imported.keys() & expected.keys()
+    missing = expected.keys() - imported.keys()
+    return {'expected': len(expected),
+            'imported': len(imported),
+            'correct': int(sum(imported[key] == expected[key] for key in found)),
+            'wrong_grid': int(sum(imported[key] != expected[key] for key in found)),
+            'missing': len(missing),
+            'missing_quoted_only': len(missing & quoted_only),
+            'unexpected': len(imported.keys() - expected.keys())}
+
+
+def run_stage(function, *args, measure_memory=True):
+    '''
+    Times one call of function(*args), then measures its peak Python memory use with tracemalloc
+    in a second call (tracemalloc slows the code down, so it isn't used while timing).
+    Printing is discarded. Memory used by worker processes isn't counted.
+
+    Returns:
+    (result, seconds, peak_mb) tuple
+    '''
+    with open(devnull, 'w') as quiet, redirect_stdout(quiet):
+        start = time.perf_counter()
+        result = function(*args)
+        seconds = time.perf_counter() - start
+
+        peak_mb = float('nan')
+        if measure_memory:
+            tracemalloc.start()
+            function(*args)
+            peak_mb = tracemalloc.get_traced_memory()[1] / 2**20
+            tracemalloc.stop()
+
+    return result, seconds, peak_mb
+
+
+def benchmark_corpus(mbox_dir, eml_dir, truth, quoted_only, num_messages, workers=None, measure_memory=True):
+    '''
+    Runs each pipeline stage on one synthetic corpus
+
+    Stages: import mbox serially and with workers, import .eml files, convert the imported
+    results to a PuzzleStore, stream the mbox straight into WordleData, build WordleData
+    from the store, and run the main analyses
+
+    Returns:
+    list of dicts, one per stage, with the stage timing, peak memory, throughput, any error
+    and for the import and streaming stages the check_results counts
+    '''
+    if workers is None:
+        workers = cpu_count() or 1
+
+    def analyse(data):
+        data.invalidate()
+        return data.stats(), data.weekly(), data.trend(), data.rolling(20), data.letter_patterns()
+
+    def check_import(wordle_result_dict):
+        return check_results(wordle_result_dict, truth, quoted_only)
+
+    def check_stream(data):
+        return check_store(data.store, truth, quoted_only)
+
+    # Later stages use the results of earlier ones. Each stage has a function checking its
+    # results against the ground truth, or None
+    outputs = {}
+    stages = [('import mbox (serial)', lambda: emailmodule.import_mbox_format(mbox_dir, 1, Metrics(quiet=True)), check_import),
+              (f'import mbox ({workers} workers)', lambda: emailmodule.import_mbox_format(mbox_dir, workers=workers), check_import),
+              ('import eml', lambda: emailmodule.import_eml_format(eml_dir), check_import),
+              ('convert', lambda: PuzzleStore.from_result_dict(outputs['import mbox (serial)'])[0], None),
+              ('stream mbox to WordleData', lambda: emailmodule.load_wordle_data(mbox_dir), check_stream),
+              ('WordleData', lambda: WordleData(outputs['convert']), None),
+              ('analyse', lambda: analyse(outputs['WordleData']), None)]
+
+    rows = []
+    for stage, function, check in stages:
+        if stage.startswith('import eml') and eml_dir is None:
+            continue
+        row = {'messages': num_messages, 'stage': stage}
+        try:
+            result, seconds, peak_mb = run_stage(function, measure_memory=measure_memory)
+        except Exception as error:
+            row['error'] = f'{type(error).__name__}: {error}'
+            rows.append(row)
+            continue
+
+        outputs[stage] = result
+        row.update({'seconds': seconds, 'peak_mb': peak_mb, 'messages_per_sec': num_messages / seconds})
+        if check is not None:
+            row.update(check(result))
+        rows.append(row)
+
+    return rows
+
+
+def run_benchmarks(corpus_sizes, benchmark_dir, num_players=6, num_puzzles=1000, workers=None,
+                   write_eml=True, measure_memory=True, seed=0):
+    '''
+    Generates a synthetic corpus of each size and benchmarks every pipeline stage on it
+
+    Parameters:
+    corpus_sizes (list): numbers of messages
+    benchmark_dir (string): directory for the corpora (one sub-directory per size) and their ground truth
+    num_players, num_puzzles (int): passed to generate_corpus
+    workers (int): number of worker processes for the parallel import (None = one per CPU)
+    write_eml (bool): also write and benchmark .eml files
+    measure_memory (bool): measure peak memory of each stage (runs every stage twice)
+    seed (int): random seed
+
+    Returns:
+    dataframe with one row per corpus size and stage
+    '''
+    rows = []
+    for num_messages in corpus_sizes:
+        corpus_dir = path.join(benchmark_dir, f'{num_messages} messages')
+        makedirs(corpus_dir, exist_ok=True)
+        mbox_dir = path.join(corpus_dir, 'Wordle.mbox')
+        eml_dir = path.join(corpus_dir, 'Wordle emails') if write_eml else None
+
+        truth, quoted_only = generate_corpus(mbox_dir, eml_dir, num_players, num_puzzles, num_messages, seed=seed)
+        with open(path.join(corpus_dir, 'Ground truth.json'), 'w') as outfile:
+            json.dump({'results': truth, 'quoted_only': quoted_only}, outfile, indent=4)
+
+        rows += benchmark_corpus(mbox_dir, eml_dir, truth, quoted_only, num_messages, workers, measure_memory)
+
+    return pd.DataFrame(rows)
@@ -0,0 +1,1056 @@
+'''Functions for extracting Wordle results from downloaded email files (.mbox and .eml)'''
+
+# Import necessary libraries
+from os import cpu_count, linesep, path, scandir
+from base64 import b64decode
+from hashlib import sha1
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from collections import deque
+from itertools import islice
+import email
+import mailbox
+import json
+import quopri
+import re
+
+from metricsmodule import Metrics
+
+# Default location of the downloaded mbox file
+MBOX_DIR = 'Data/Wordle emails/Wordle.mbox'
+
+# Line separator used by the mailbox module when it reads mbox files
+MBOX_LINESEP = linesep.encode('ascii')
+
+# A message starts on each line beginning with 'From '
+MBOX_FROM_LINE = re.compile(b'^From ', re.MULTILINE)
+
+# Message-ID header of a raw message, including folded continuation lines
+MESSAGE_ID_HEADER = re.compile(rb'^Message-ID:(.*(?:\r?\n[ \t].*)*)', re.MULTILINE | re.IGNORECASE)
+
+# Blank line separating the headers from the body of a raw message
+HEADER_END = re.compile(rb'\n\r?\n')
+
+# Base64 encodings of 'Wordle' at each of the 3 possible byte alignments, with the position of
+# each pattern within its 4 character base64 block. Characters that also depend on the bytes
+# before or after 'Wordle' are left out.
+WORDLE_BASE64 = (('V29yZGxl', 0), ('dvcmRs', 2), ('Xb3JkbG', 3))
+
+# Header line of a Wordle result, possibly quoted, e.g. 'Wordle 1,209 4/6' or '> Wordle 815 X/6*'
+WORDLE_HEADER = re.compile(r'^(?P<quote>[>\t ]*)Wordle (?P<puzzle>\d[\d,.]*) (?P<score>[1-6X])/6\*?', re.MULTILINE)
+
+# Grey, yellow and green boxes of a grid line, and the quote marks and whitespace around them
+WORDLE_BOXES = {chr(11036), chr(129000), chr(129001)}
+QUOTE_CHARS = '>\t\r '
+
+# The int representation 1-3 of each box, as in wordlemodule.decode_grids (see pack_boxes)
+BOX_VALUES = {chr(11036): 1, chr(129000): 2, chr(129001): 3}
+VALUE_BOXES = {value: box for box, value in BOX_VALUES.items()}
+
+# Email address in a reply's attribution line, and the time before the sender's name
+QUOTED_ADDRESS = re.compile(r'<?([^\s<>@]+@[^\s<>@]+?)>?(?:\s|$)')
+ATTRIBUTION_TIME = re.compile(r'\d{1,2}:\d{2}(?::\d{2})?(?:\s*[AaPp]\.?\s?[Mm]\.?)?')
+
+# Number of bytes read from the mbox file at a time when streaming
+MBOX_BLOCK_SIZE = 2**24
+
+# Which of two results for the same sender and puzzle is kept: the 'last' or 'first' in mailbox order
+# (a sender's own result is always kept over a copy quoted in a reply, see WordleResults)
+DUPLICATE_POLICY = 'last'
+
+# Number of base64 characters decoded to check the Wordle header a region starts with (see wordle_text)
+REGION_HEAD_SIZE = 64
+
+# Number of decoded payloads kept by a DecodeCache
+DECODE_CACHE_SIZE = 2**16
+
+# Number of threads reading .eml files
+EML_READ_THREADS = 16
+
+# Number of .eml files read ahead of the parser, per reading thread
+EML_READ_AHEAD = 4
+
+# Default locations of the imported data and of the incremental import checkpoint
+JSON_DIR = 'Data/Script data/Imported_email_data.json'
+CHECKPOINT_DIR = 'Data/Script data/Import_checkpoint.json'
+
+# Number of bytes before the checkpoint offset used to check that the mbox file was only appended to
+CHECKPOINT_TAIL_BYTES = 4096
+
+
+def extract_wordles(message, metrics=None, cache=None):
+    '''
+    Extracts every Wordle result in a single email message: its own, and any quoted in a reply.
+
+    Only text/plain parts are read (html parts and attachments are never decoded), using each
+    part's declared Content-Transfer-Encoding and charset. The Wordle header is found in the
+    encoded text first (see find_wordle_region), and only the text from there on is decoded.
+
+    Parameters:
+    message (email.message.Message): the email message
+    metrics (Metrics): (optional) counts single and multipart messages ('content' counter), the
+                       encoding of each decoded part ('decode' counter), quoted results ('import'
+                       counter) and why messages or results were skipped ('skip' counter)
+    cache (DecodeCache): (optional) Wordle regions decoded earlier, identical regions are only decoded once
+
+    Returns:
+    list of (sender, puzzleNumber, content_trimmed, quoted) tuples, quoted results first, so
+    the message's own results come last
+    '''
+    if metrics is None:
+        metrics = Metrics()
+    metrics.count('content', 'multipart' if message.is_multipart() else 'single part')
+
+    # Apple Mail marks quoted-printable messages as 7bit
+    mailer = message['X-Mailer']
+    is_apple_mail = mailer is not None and mailer[0:10] == 'Apple Mail'
+
+    text_parts = [part for part in message.walk()
+                  if part.get_content_type() == 'text/plain' and not part.get_filename()]
+    if not text_parts:
+        metrics.count('skip', 'no text/plain part')
+        return []
+
+    results = []
+    for part in text_parts:
+        encoding = str(part['Content-Transfer-Encoding'] or '7bit').strip().lower()
+        if is_apple_mail and encoding in ('7bit', '8bit'):
+            encoding = 'quoted-printable'
+        charset = part.get_content_charset() or 'utf-8'
+
+        payload = part.get_payload(decode=False)
+        try:
+            encoded = wordle_text(payload, encoding, charset)
+        except (ValueError, LookupError):
+            metrics.count('skip', 'undecodable')
+            continue
+        if encoded is None:
+            continue
+
+        blocks = None
+        if cache is not None:
+            key = cache.key(encoded, encoding, charset)
+            blocks = cache.get(key)
+            metrics.count('decode cache', 'miss' if blocks is None else 'hit')
+
+        if blocks is None:
+            try:
+                text = decode_payload(encoded, encoding, charset)
+            except (ValueError, LookupError):
+                metrics.count('skip', 'undecodable')
+                continue
+            metrics.count('decode', encoding)
+            blocks = split_wordle_blocks(text, None)
+            if cache is not None:
+                cache.put(key, blocks)
+
+        # The message's own results are credited to its sender
+        for sender, puzzleNumber, content_trimmed, quoted in blocks:
+            if quoted and sender is None:
+                metrics.count('skip', 'quoted result without sender')
+                continue
+            if quoted:
+                metrics.count('import', 'quoted results')
+            else:
+                sender = message['from']
+            results.append((sender, puzzleNumber, content_trimmed, quoted))
+
+    if not results:
+        metrics.count('skip', 'not a Wordle result')
+    return results
+
+
+def find_wordle_region(payload, encoding):
+    '''
+    Finds the first Wordle header in a still encoded text/plain payload
+
+    Parameters:
+    payload (string): the encoded payload
+    encoding (string): its Content-Transfer-Encoding
+
+    Returns:
+    the encoded text from the start of the header's line (for base64, from the start of the
+    4 character block with the line break before it), or None if there is no Wordle header
+    '''
+    if encoding == 'base64':
+        # Line breaks never split a 4 character base64 block, so they can be removed
+        encoded = ''.join(payload.split())
+        start = None
+        for pattern, block_offset in WORDLE_BASE64:
+            pos = encoded.find(pattern)
+            while pos > -1 and pos % 4 != block_offset:
+                pos = encoded.find(pattern, pos + 1)
+            if pos > -1 and (start is None or pos - block_offset < start):
+                # 'Wordle' starts at byte 0, 1 or 2 of the block for character offsets 0, 2 and 3
+                start = pos - block_offset
+                byte_offset = block_offset * 3 // 4
+        if start is None:
+            return None
+
+        # Move back block by block to the line break before the header, so any quote marks
+        # before it are decoded with it
+        header_start = start
+        while start > 0 and b'\n' not in b64decode(encoded[start:header_start+4])[:(header_start-start)//4*3 + byte_offset]:
+            start -= 4
+        stop = start + (len(encoded) - start) // 4 * 4
+        return encoded[start:stop]
+
+    # Other encodings leave the header as plain text
+    pos = payload.find('Wordle')
+    if pos == -1:
+        return None
+    return payload[payload.rfind('\n', 0, pos) + 1:]
+
+
+def wordle_text(payload, encoding, charset):
+    '''
+    Finds the encoded text of a text/plain payload that has to be decoded to read its Wordle
+    results: from its first Wordle header on (see find_wordle_region). If that header is quoted
+    (or isn't a whole header line), it is the whole payload, as the reply's attribution line
+    naming the quoted sender comes before it. Only the start of the region is decoded to check.
+
+    Returns:
+    the encoded text, or None if there is no Wordle header. Raises ValueError (binascii.Error,
+    UnicodeError) for undecodable payloads and LookupError for unknown charsets.
+    '''
+    if encoding not in ('base64', 'quoted-printable', '7bit', '8bit', 'binary'):
+        raise ValueError('Unsupported Content-Transfer-Encoding ' + encoding)
+
+    region = find_wordle_region(payload, encoding)
+    if region is None:
+        return None
+
+    # The header line, from the start of the region
+    if encoding == 'base64':
+        head = region[:REGION_HEAD_SIZE]
+    else:
+        head = region[:region.find('\n') + 1 or len(region)]
+    text = decode_payload(head, encoding, charset)
+    # A base64 region can start with the end of the line before the header's
+    header = WORDLE_HEADER.match(text, text.rfind('\n', 0, text.find('Wordle')) + 1)
+    if header is None or '>' in header.group('quote'):
+        return payload
+    return region
+
+
+def decode_payload(payload, encoding, charset):
+    '''Decodes a (part of a) text/plain payload, see wordle_text'''
+    if encoding == 'base64':
+        # The region may start inside a multibyte character before the header
+        return b64decode(''.join(payload.split())).decode(charset, 'replace')
+    if encoding == 'quoted-printable':
+        return quopri.decodestring(payload.encode('utf-8', 'surrogateescape')).decode(charset)
+    return payload
+
+
+def split_wordle_blocks(text, sender):
+    '''
+    Finds every Wordle result in a decoded message text, including results quoted in replies
+    (lines starting with '>'), which are credited to the sender named in the reply's
+    "On <date> <sender> wrote:" line
+
+    Parameters:
+    text (string): decoded message text
+    sender (string): sender of the message
+
+    Returns:
+    list of (sender, puzzleNumber, content_trimmed, quoted) tuples, oldest (most deeply quoted)
+    first. sender is None for quoted results whose sender can't be found. content_trimmed is
+    the text after the '/6' of the header up to the end of the last row of the grid.
+    '''
+    blocks = []
+    for match in WORDLE_HEADER.finditer(text):
+        puzzleNumber = match.group('puzzle').replace(',', '').replace('.', '')
+        depth = match.group('quote').count('>')
+
+        # The grid is the run of box-only lines after the header, ignoring quote marks and blank lines
+        grid_end = match.end()
+        line_end = text.find('\n', match.end())
+        while line_end > -1:
+            line_start = line_end + 1
+            line_end = text.find('\n', line_start)
+            line = text[line_start:] if line_end == -1 else text[line_start:line_end]
+            cells = line.strip(QUOTE_CHARS)
+            if not cells:
+                if grid_end > match.end():
+                    break
+                continue
+            if not set(cells) <= WORDLE_BOXES:
+                break
+            grid_end = line_start + len(line.rstrip(QUOTE_CHARS))
+        if grid_end == match.end():
+            continue
+
+        block_sender = quoted_sender(text, match.start()) if depth else sender
+        blocks.append((depth, block_sender, puzzleNumber, text[match.end():grid_end], depth > 0))
+
+    # Deeper quotes are older, so list them first (the sort keeps text order within a depth)
+    blocks.sort(key=lambda block: -block[0])
+    return [block[1:] for block in blocks]
+
+
+def quoted_sender(text, position):
+    '''
+    Finds the sender of a quoted Wordle result from the last "On <date> <sender> wrote:"
+    line before position in text
+
+    Returns:
+    'Name <address>' (or just the address), or None if there is no attribution line
+    '''
+    wrote = text.rfind('wrote:', 0, position)
+    if wrote == -1:
+        return None
+    on = text.rfind('On ', 0, wrote)
+    if on == -1:
+        return None
+
+    # Gmail wraps long attribution lines, which may themselves be quoted
+    attribution = re.sub(r'\s*\n[>\s]*', ' ', text[on+3:wrote]).strip()
+    address = QUOTED_ADDRESS.search(attribution)
+    if address is None:
+        return None
+
+    # The name follows the time the message was sent (or the date, if there is no time)
+    name = attribution[:address.start()]
+    times = list(ATTRIBUTION_TIME.finditer(name))
+    name = name[times[-1].end():] if times else name[name.rfind(',')+1:]
+    name = name.strip(' "\'')
+
+    return f'{name} <{address.group(1)}>' if name else address.group(1)
+
+
+class WordleResults:
+    '''
+    Collects imported Wordle results with an explicit policy for duplicates, i.e. more than one
+    result for the same sender and puzzle. A sender's own result always replaces a copy quoted
+    in someone else's reply, and is never replaced by one. Otherwise keep='last' keeps the
+    later result in mailbox order and keep='first' the earlier one. Duplicates with different
+    grids are conflicts: they are counted ('duplicates' counter), listed in conflicts and
+    in the 'conflicts' notes of metrics, and printed unless metrics.quiet.
+
+    Attributes:
+    results (dict): {sender: {puzzle: grid}} of the kept results (empty if keep_results is False)
+    seen (dict): {(sender, puzzle): (quoted, packed)} of the kept results, packed being the
+                 grid's boxes packed into an int (see pack_boxes), so comparing duplicates
+                 doesn't keep a string per result when keep_results is False
+    conflicts (list): {'sender', 'puzzle', 'kept', 'discarded'} dicts of conflicting duplicates
+    '''
+    def __init__(self, keep=DUPLICATE_POLICY, keep_results=True, metrics=None):
+        if keep not in ('last', 'first'):
+            raise ValueError(f'Unknown duplicate policy {keep!r}')
+        self.keep = keep
+        self.keep_results = keep_results
+        self.metrics = Metrics() if metrics is None else metrics
+        self.results = {}
+        self.seen = {}
+        self.conflicts = []
+
+    @classmethod
+    def from_dict(cls, wordle_result_dict, quoted=(), keep=DUPLICATE_POLICY, metrics=None):
+        '''
+        Collects results imported earlier
+
+        Parameters:
+        wordle_result_dict (dict): {sender: {puzzle: grid}}
+        quoted (list): [sender, puzzle] of the results that were only seen quoted
+        '''
+        results = cls(keep, metrics=metrics)
+        quoted = {tuple(key) for key in quoted}
+        for sender, puzzles in wordle_result_dict.items():
+            for puzzleNumber, content_trimmed in puzzles.items():
+                results.add(sender, puzzleNumber, content_trimmed, (sender, puzzleNumber) in quoted)
+        return results
+
+    def add(self, sender, puzzleNumber, content_trimmed, quoted=False):
+        '''
+        Adds one result, following the duplicate policy
+
+        Returns:
+        True if the result was kept (it is new, or replaces the earlier result)
+        '''
+        key = (sender, puzzleNumber)
+        packed = pack_boxes(content_trimmed)
+        previous = self.seen.get(key)
+
+        if previous is None:
+            keep_new = True
+        else:
+            previous_quoted, previous_packed = previous
+            if previous_quoted != quoted:
+                keep_new = previous_quoted
+            else:
+                keep_new = self.keep == 'last'
+
+            if previous_packed == packed:
+                self.metrics.count('duplicates', 'identical')
+            else:
+                boxes, previous_boxes = unpack_boxes(packed), unpack_boxes(previous_packed)
+                kept, discarded = (boxes, previous_boxes) if keep_new else (previous_boxes, boxes)
+                conflict = {'sender': sender, 'puzzle': puzzleNumber, 'kept': kept, 'discarded': discarded}
+                self.conflicts.append(conflict)
+                self.metrics.count('duplicates', 'conflict')
+                self.metrics.note('conflicts', conflict)
+                self.metrics.log('Conflicting results for puzzle', puzzleNumber, 'From: ', sender)
+
+        if keep_new:
+            self.seen[key] = (quoted, packed)
+            if self.keep_results:
+                self.results.setdefault(sender, {})[puzzleNumber] = content_trimmed
+        return keep_new
+
+    def update(self, other):
+        '''Adds the kept results of other, which were collected from later in the mailbox'''
+        for (sender, puzzleNumber), (quoted, packed) in other.seen.items():
+            self.add(sender, puzzleNumber, other.results[sender][puzzleNumber], quoted)
+        return self
+
+    def quoted(self):
+        '''[sender, puzzle] of the kept results that were only seen quoted'''
+        return [list(key) for key, (quoted, packed) in self.seen.items() if quoted]
+
+
+def pack_boxes(content_trimmed):
+    '''
+    Packs the boxes of a Wordle result 2 bits each into an int, the first box in the lowest
+    bits as in wordlemodule.pack_grids. Other characters (line breaks, quote marks) are ignored,
+    and as every box is 1-3 the packed int keeps the number of boxes (see unpack_boxes).
+    '''
+    packed = 0
+    shift = 0
+    for char in content_trimmed:
+        value = BOX_VALUES.get(char)
+        if value is not None:
+            packed |= value << shift
+            shift += 2
+    return packed
+
+
+def unpack_boxes(packed):
+    '''The boxes of a result packed by pack_boxes, as a string without line breaks'''
+    boxes = []
+    while packed:
+        boxes.append(VALUE_BOXES[packed & 3])
+        packed >>= 2
+    return ''.join(boxes)
+
+
+class DecodeCache:
+    '''
+    Wordle results decoded from text/plain payloads, keyed by a hash of the encoded text from
+    the first Wordle header on (see wordle_text), so a result that is in the mailbox more than
+    once (e.g. under several labels, or forwarded with different text before it) is only
+    decoded once. A grid quoted in a reply is encoded differently (quote marks, and for base64
+    its position in the text), so it is decoded again, and WordleResults merges the copies.
+    A region whose first header is quoted is keyed by the whole payload, which it is decoded
+    with. The oldest entries are dropped beyond maxsize.
+    '''
+    def __init__(self, maxsize=DECODE_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.blocks = {}
+
+    @staticmethod
+    def key(encoded, encoding, charset):
+        '''Content hash of encoded text (see wordle_text)'''
+        digest = sha1(f'{encoding}:{charset}:'.encode('ascii', 'replace'))
+        digest.update(encoded.encode('utf-8', 'surrogateescape'))
+        return digest.digest()
+
+    def get(self, key):
+        '''Cached split_wordle_blocks(text, None) of the decoded text, or None if it isn't cached'''
+        return self.blocks.get(key)
+
+    def put(self, key, blocks):
+        if len(self.blocks) >= self.maxsize:
+            del self.blocks[next(iter(self.blocks))]
+        self.blocks[key] = blocks
+
+
+def find_mbox_shards(mbox_dir, num_shards, offset=0):
+    '''
+    Splits an mbox file into byte ranges that start on 'From ' message boundaries
+
+    Parameters:
+    mbox_dir (string): path of the mbox file
+    num_shards (int): the desired number of byte ranges
+    offset (int): byte offset to start splitting from (the rest of the file is ignored)
+
+    Returns:
+    shards (list): list of (start, stop) byte offsets, in file order
+    '''
+    file_size = path.getsize(mbox_dir)
+
+    # Move each evenly spaced offset forward to the start of the next message
+    starts = [offset]
+    with open(mbox_dir, 'rb') as file:
+        for i in range(1, num_shards):
+            file.seek(offset + (file_size - offset) * i // num_shards)
+            file.readline()   #skip the rest of a partially read line
+            while True:
+                line_pos = file.tell()
+                line = file.readline()
+                if not line:
+                    line_pos = file_size
+                    break
+                if line.startswith(b'From '):
+                    break
+            if line_pos > starts[-1]:
+                starts.append(line_pos)
+
+    stops = starts[1:] + [file_size]
+    return [(start, stop) for start, stop in zip(starts, stops) if start < stop]
+
+
+def split_mbox_raw(chunk):
+    '''
+    Splits raw mbox bytes into messages, using the same boundary rules as mailbox.mbox
+
+    Parameters:
+    chunk (bytes): mbox file contents starting on a 'From ' line
+
+    Returns:
+    generator of (from_line, raw_message) bytes tuples
+    '''
+    def message_stop(boundary):
+        # Like mailbox.mbox, drop the blank line that separates a message from the next 'From ' line
+        sep_start = boundary - len(MBOX_LINESEP)
+        if sep_start >= 0 and chunk[sep_start:boundary] == MBOX_LINESEP \
+                and (sep_start == 0 or chunk[sep_start-1:sep_start] == b'\n'):
+            return sep_start
+        return boundary
+
+    # Every line starting with 'From ' begins a new message
+    starts = [match.start() for match in MBOX_FROM_LINE.finditer(chunk)]
+    stops = [message_stop(boundary) for boundary in starts[1:] + [len(chunk)]]
+
+    for start, stop in zip(starts, stops):
+        from_end = chunk.find(b'\n', start, stop) + 1 or stop
+        yield chunk[start:from_end], chunk[from_end:stop]
+
+
+def make_mbox_message(from_line, raw_message):
+    '''Builds a mailbox.mboxMessage from raw bytes the same way mailbox.mbox.get_message() does'''
+    msg = mailbox.mboxMessage(raw_message.replace(MBOX_LINESEP, b'\n'))
+    msg.set_from(from_line.replace(MBOX_LINESEP, b'')[5:].decode('ascii'))
+    return msg
+
+
+def split_mbox_bytes(chunk):
+    '''
+    Splits raw mbox bytes into messages, using the same boundary rules as mailbox.mbox
+
+    Parameters:
+    chunk (bytes): mbox file contents starting on a 'From ' line
+
+    Returns:
+    generator of mailbox.mboxMessage objects
+    '''
+    for from_line, raw_message in split_mbox_raw(chunk):
+        yield make_mbox_message(from_line, raw_message)
+
+
+def message_key(raw_message):
+    '''
+    Returns a key identifying a raw message without decoding it: the Message-ID header
+    if there is one, otherwise a hash of the message bytes
+    '''
+    header_end = HEADER_END.search(raw_message)
+    headers = raw_message if header_end is None else raw_message[:header_end.start()]
+    message_id = MESSAGE_ID_HEADER.search(headers)
+    if message_id is not None and message_id.group(1).strip():
+        return message_id.group(1).strip().decode('ascii', 'replace')
+    return 'sha1:' + sha1(raw_message).hexdigest()
+
+
+def import_mbox_shard(mbox_dir, start, stop, skip_keys=None, metrics=None, keep=DUPLICATE_POLICY):
+    '''
+    Imports wordle data from the messages in one byte range of an mbox file
+
+    Parameters:
+    mbox_dir (string): path of the mbox file
+    start (int): byte offset of the first 'From ' line in the range
+    stop (int): byte offset of the end of the range
+    skip_keys (set): (optional) message keys that have already been imported. These
+                     messages are skipped without being decoded
+    metrics (Metrics): (optional) counts messages and results ('import' counter), see extract_wordles
+    keep (string): duplicate policy, 'last' or 'first' (see WordleResults)
+
+    Returns:
+    results (WordleResults): the results in this range
+    new_keys (list): keys of the messages that were decoded (only if skip_keys is given)
+    '''
+    if metrics is None:
+        metrics = Metrics()
+
+    with open(mbox_dir, 'rb') as file:
+        file.seek(start)
+        chunk = file.read(stop - start)
+
+    results = WordleResults(keep, metrics=metrics)
+    cache = DecodeCache()
+    new_keys = []
+    for from_line, raw_message in split_mbox_raw(chunk):
+        metrics.count('import', 'messages')
+
+        # Skip messages imported on a previous run
+        if skip_keys is not None:
+            key = message_key(raw_message)
+            if key in skip_keys:
+                metrics.count('skip', 'already imported')
+                continue
+            new_keys.append(key)
+
+        for result in extract_wordles(make_mbox_message(from_line, raw_message), metrics, cache):
+            metrics.count('import', 'results')
+            results.add(*result)
+
+    if skip_keys is not None:
+        return results, new_keys
+    return results
+
+
+def import_mbox_shard_counted(mbox_dir, start, stop, skip_keys=None, keep=DUPLICATE_POLICY):
+    '''
+    Runs import_mbox_shard in a worker process, where the caller's Metrics can't be updated
+
+    Returns:
+    (result, metrics) tuple: the result of import_mbox_shard and the Metrics it recorded
+    '''
+    metrics = Metrics(quiet=True)
+    return import_mbox_shard(mbox_dir, start, stop, skip_keys, metrics, keep), metrics
+
+
+def import_mbox_format(mbox_dir=MBOX_DIR, workers=1, metrics=None, keep=DUPLICATE_POLICY):
+    '''
+    Import wordle data from each email in mbox format
+
+    Parameters:
+    mbox_dir (string): path of the mbox file
+    workers (int): number of worker processes. 1 reads the mailbox serially,
+                   None uses one process per CPU
+    metrics (Metrics): (optional) times the 'import' stage and counts decode paths and skipped
+                       messages. The serial import prints each message number unless metrics.quiet
+    keep (string): which of two results for the same sender and puzzle is kept, 'last' or 'first'
+                   (see WordleResults). Conflicting results are reported in metrics
+
+    Returns:
+    wordle_result_dict (dict): {sender: {puzzle: grid}}
+    '''
+    if metrics is None:
+        metrics = Metrics()
+    if workers is None:
+        workers = cpu_count() or 1
+
+    if workers > 1:
+        return import_mbox_parallel(mbox_dir, workers, metrics, keep)
+
+    with metrics.stage('import') as record:
+        messages_before = metrics.counters.get('import', {}).get('messages', 0)
+        results = import_mbox_serial(mbox_dir, metrics, keep)
+        record['items'] = metrics.counters.get('import', {}).get('messages', 0) - messages_before
+
+    return results.results
+
+
+def import_mbox_serial(mbox_dir, metrics, keep=DUPLICATE_POLICY):
+    '''Import wordle data from each email in mbox format, one message at a time (see import_mbox_format)'''
+
+    # Create mailbox object
+    my_mailbox = mailbox.mbox(mbox_dir, create=False)
+
+    # Collect results, and decode each distinct payload once
+    results = WordleResults(keep, metrics=metrics)
+    cache = DecodeCache()
+
+    # Iterate through mbox messages
+    for idx, message in enumerate(my_mailbox):
+
+        metrics.log(idx)
+        metrics.count('import', 'messages')
+
+        for result in extract_wordles(message, metrics, cache):
+            metrics.count('import', 'results')
+            results.add(*result)
+
+    return results
+
+
+def import_mbox_parallel(mbox_dir, workers, metrics=None, keep=DUPLICATE_POLICY):
+    '''
+    Import wordle data from an mbox file using a pool of worker processes.
+    The file is split on message boundaries by byte offset, each shard is decoded
+    in its own process and the shard results are merged in file order.
+
+    Parameters:
+    mbox_dir (string): path of the mbox file
+    workers (int): number of worker processes
+    metrics (Metrics): (optional) times the 'import' stage, counters are collected from every worker
+    keep (string): duplicate policy, 'last' or 'first' (see WordleResults)
+
+    Returns:
+    wordle_result_dict (dict): {sender: {puzzle: grid}}, identical to the serial import
+    '''
+    if metrics is None:
+        metrics = Metrics()
+
+    with metrics.stage('import') as record:
+        # Use a few shards per worker so one slow shard doesn't hold up the pool
+        shards = find_mbox_shards(mbox_dir, workers*4)
+
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            shard_results = list(executor.map(import_mbox_shard_counted,
+                                              [mbox_dir]*len(shards),
+                                              [start for start, stop in shards],
+                                              [stop for start, stop in shards],
+                                              [None]*len(shards),
+                                              [keep]*len(shards)))
+
+        # Merge in file order, applying the duplicate policy across shards
+        results = WordleResults(keep, metrics=metrics)
+        for shard_result, shard_metrics in shard_results:
+            metrics.merge(shard_metrics)
+            results.update(shard_result)
+            record['items'] = (record['items'] or 0) + shard_metrics.counters.get('import', {}).get('messages', 0)
+
+    return results.results
+
+
+def read_checkpoint(checkpoint_dir, mbox_dir):
+    '''
+    Loads the incremental import checkpoint for an mbox file
+
+    Parameters:
+    checkpoint_dir (string): path of the checkpoint .json file
+    mbox_dir (string): path of the mbox file
+
+    Returns:
+    checkpoint (dict): the processed message keys, the byte offset read up to and a hash
+                       of the bytes before it. Empty if there is no checkpoint for this mbox file
+    '''
+    if not path.exists(checkpoint_dir):
+        return {}
+
+    with open(checkpoint_dir, 'r') as file:
+        checkpoint = json.load(file)
+
+    if checkpoint.get('mbox_dir') != mbox_dir:
+        return {}
+    return checkpoint
+
+
+def mbox_tail_hash(mbox_dir, offset):
+    '''Hashes the bytes just before offset, to check later that the mbox file was only appended to'''
+    with open(mbox_dir, 'rb') as file:
+        file.seek(max(offset - CHECKPOINT_TAIL_BYTES, 0))
+        return sha1(file.read(min(offset, CHECKPOINT_TAIL_BYTES))).hexdigest()
+
+
+def import_mbox_incremental(mbox_dir=MBOX_DIR, json_dir=JSON_DIR, checkpoint_dir=CHECKPOINT_DIR, workers=1, metrics=None,
+                            keep=DUPLICATE_POLICY):
+    '''
+    Imports only the messages that were added to the mbox file since the last run,
+    and merges their wordle results into the existing .json data.
+
+    A checkpoint file keeps the keys (Message-ID, or a hash of the message) of every message
+    processed so far and the byte offset the mbox file was read up to. If the file was only
+    appended to, reading starts at that offset. Otherwise (e.g. a fresh Google Takeout export)
+    the whole file is scanned, but messages with a known key are skipped without being decoded.
+
+    Parameters:
+    mbox_dir (string): path of the mbox file
+    json_dir (string): path of the imported data .json file, which is read and updated
+    checkpoint_dir (string): path of the checkpoint .json file, which is read and updated
+    workers (int): number of worker processes (None = one per CPU)
+    metrics (Metrics): (optional) times the 'import' and 'save' stages and counts decode paths
+                       and skipped messages
+    keep (string): duplicate policy, 'last' or 'first' (see WordleResults). Results that were only
+                   seen quoted are listed in the checkpoint, so the policy holds across runs
+
+    Returns:
+    wordle_result_dict (dict): {sender: {puzzle: grid}} for all messages imported so far
+    '''
+    if metrics is None:
+        metrics = Metrics()
+    if workers is None:
+        workers = cpu_count() or 1
+
+    # Load data from previous runs
+    wordle_result_dict = {}
+    checkpoint = read_checkpoint(checkpoint_dir, mbox_dir)
+    if checkpoint and path.exists(json_dir):
+        with open(json_dir, 'r') as file:
+            wordle_result_dict = json.load(file)
+    else:
+        checkpoint = {}
+    seen_keys = set(checkpoint.get('message_keys', []))
+
+    # Start at the checkpoint offset if everything before it is unchanged
+    file_size = path.getsize(mbox_dir)
+    offset = checkpoint.get('offset', 0)
+    if offset > file_size or mbox_tail_hash(mbox_dir, offset) != checkpoint.get('tail_hash'):
+        offset = 0
+
+    # Decode new messages, in parallel if requested
+    with metrics.stage('import') as record:
+        shards = find_mbox_shards(mbox_dir, workers*4 if workers > 1 else 1, offset)
+        if workers > 1:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                shard_results = list(executor.map(import_mbox_shard_counted,
+                                                  [mbox_dir]*len(shards),
+                                                  [start for start, stop in shards],
+                                                  [stop for start, stop in shards],
+                                                  [seen_keys]*len(shards),
+                                                  [keep]*len(shards)))
+            for result, shard_metrics in shard_results:
+                metrics.merge(shard_metrics)
+            shard_results = [result for result, shard_metrics in shard_results]
+        else:
+            shard_results = [import_mbox_shard(mbox_dir, start, stop, seen_keys, metrics, keep) for start, stop in shards]
+        record['items'] = sum(len(keys) for result, keys in shard_results)
+
+        # Merge new results into the existing data, in mailbox order
+        results = WordleResults.from_dict(wordle_result_dict, checkpoint.get('quoted', []), keep, metrics)
+        for shard_result, keys in shard_results:
+            results.update(shard_result)
+            seen_keys.update(keys)
+        wordle_result_dict = results.results
+
+    # Save the data before the checkpoint, so an interrupted run is simply repeated
+    with metrics.stage('save'):
+        with open(json_dir, 'w') as outfile:
+            json.dump(wordle_result_dict, outfile, indent=4)
+
+        with open(checkpoint_dir, 'w') as outfile:
+            json.dump({'mbox_dir': mbox_dir,
+                       'offset': file_size,
+                       'tail_hash': mbox_tail_hash(mbox_dir, file_size),
+                       'message_keys': sorted(seen_keys),
+                       'quoted': results.quoted()},
+                      outfile)
+
+    return wordle_result_dict
+
+
+def iter_mbox_raw(mbox_dir, block_size=MBOX_BLOCK_SIZE):
+    '''
+    Reads an mbox file block by block and yields its messages without loading the whole file
+
+    Parameters:
+    mbox_dir (string): path of the mbox file
+    block_size (int): number of bytes read at a time
+
+    Returns:
+    generator of (from_line, raw_message) bytes tuples, as split_mbox_raw
+    '''
+    leftover = b''
+    with open(mbox_dir, 'rb') as file:
+        while True:
+            block = file.read(block_size)
+            if not block:
+                break
+            buffer = leftover + block
+
+            # The last message in the buffer may continue in the next block
+            last_start = buffer.rfind(b'\nFrom ') + 1
+            yield from split_mbox_raw(buffer[:last_start])
+            leftover = buffer[last_start:]
+
+    yield from split_mbox_raw(leftover)
+
+
+def stream_mbox_records(mbox_dir=MBOX_DIR, metrics=None, keep=DUPLICATE_POLICY):
+    '''
+    Streams the wordle results in an mbox file, one message at a time
+
+    Parameters:
+    mbox_dir (string): path of the mbox file
+    metrics (Metrics): (optional) counts messages, results, decode paths and skipped messages
+    keep (string): duplicate policy, 'last' or 'first' (see WordleResults)
+
+    Returns:
+    generator of (sender, puzzleNumber, content_trimmed) tuples, in mailbox order. Duplicates
+    are only yielded if the policy keeps them, so the last record for each sender and puzzle
+    is the one to keep
+    '''
+    if metrics is None:
+        metrics = Metrics()
+
+    # Only the grids of the kept results are remembered, to detect conflicts
+    results = WordleResults(keep, keep_results=False, metrics=metrics)
+    cache = DecodeCache()
+    for from_line, raw_message in iter_mbox_raw(mbox_dir):
+        metrics.count('import', 'messages')
+        for sender, puzzleNumber, content_trimmed, quoted in extract_wordles(make_mbox_message(from_line, raw_message), metrics, cache):
+            metrics.count('import', 'results')
+            if results.add(sender, puzzleNumber, content_trimmed, quoted):
+                yield sender, puzzleNumber, content_trimmed
+
+
+def load_wordle_data(mbox_dir=MBOX_DIR, json_dir=None, store_dir=None, metrics=None, keep=DUPLICATE_POLICY):
+    '''
+    Imports an mbox file straight into a WordleData object in a single pass, without
+    writing and re-reading the intermediate .json and store files
+
+    Parameters:
+    mbox_dir (string): path of the mbox file
+    json_dir (string): (optional) also save the imported results as a .json file here
+    store_dir (string): (optional) also save the converted puzzles as a store file here
+    metrics (Metrics): (optional) times the 'import and convert', 'save' and 'load' stages,
+                       and counts decode paths and skipped messages and puzzles
+    keep (string): duplicate policy, 'last' or 'first' (see WordleResults)
+
+    Returns:
+    data (WordleData): the imported data
+    '''
+    from wordlemodule import PuzzleStore, WordleData
+
+    if metrics is None:
+        metrics = Metrics()
+
+    records = stream_mbox_records(mbox_dir, metrics, keep)
+
+    # Only keep the result strings if they are to be saved
+    if json_dir is not None:
+        wordle_result_dict = {}
+        def keep_records(records):
+            for sender, puzzleNumber, content_trimmed in records:
+                wordle_result_dict.setdefault(sender, {})[puzzleNumber] = content_trimmed
+                yield sender, puzzleNumber, content_trimmed
+        records = keep_records(records)
+
+    # Reading and converting are interleaved, so they are timed as one stage
+    with metrics.stage('import and convert') as record:
+        messages_before = metrics.counters.get('import', {}).get('messages', 0)
+        store, skipped = PuzzleStore.from_records(records)
+        record['items'] = metrics.counters.get('import', {}).get('messages', 0) - messages_before
+    for sender, puzz in skipped:
+        metrics.log('Skipped malformed puzzle', puzz, 'From: ', sender)
+        metrics.count('skip', 'malformed puzzle')
+
+    with metrics.stage('save'):
+        if json_dir is not None:
+            with open(json_dir, 'w') as outfile:
+                json.dump(wordle_result_dict, outfile, indent=4)
+        if store_dir is not None:
+            store.save(store_dir)
+
+    return WordleData(store, metrics)
+
+
+def find_email_files(email_dir):
+    '''
+    Finds the email files in a folder of .eml files or a Maildir tree, including sub-folders
+
+    Parameters:
+    email_dir (string): path of the folder
+
+    Returns:
+    list of paths of .eml files and of messages in Maildir cur and new folders, sorted
+    by file name (Maildir file names start with the delivery time)
+    '''
+    email_files = []
+    folders = [email_dir]
+    while folders:
+        with scandir(folders.pop()) as entries:
+            for entry in entries:
+                if entry.name.startswith('.'):
+                    continue
+                if entry.is_dir():
+                    # Maildir messages are still being delivered while they are in tmp
+                    if entry.name != 'tmp':
+                        folders.append(entry.path)
+                elif entry.name.lower().endswith('.eml') or path.basename(path.dirname(entry.path)) in ('cur', 'new'):
+                    email_files.append(entry.path)
+
+    return sorted(email_files, key=lambda email_file: (path.basename(email_file), email_file))
+
+
+def read_file(file_dir):
+    '''Reads a whole file as bytes'''
+    with open(file_dir, 'rb') as file:
+        return file.read()
+
+
+def import_email_files(email_files, threads=EML_READ_THREADS, metrics=None, keep=DUPLICATE_POLICY):
+    '''
+    Imports wordle data from a list of email files. Files are read by a pool of threads
+    (reading is I/O bound) and parsed in order as they arrive. At most threads*EML_READ_AHEAD
+    files are read ahead of the parser, so a large folder is not held in memory at once.
+
+    Parameters:
+    email_files (list): paths of the email files, in the order their results are merged
+    threads (int): number of threads reading files
+    metrics (Metrics): (optional) counts messages and results ('import' counter), see extract_wordles
+    keep (string): duplicate policy, 'last' or 'first' (see WordleResults)
+
+    Returns:
+    results (WordleResults): the results, merged in file order
+    '''
+    if metrics is None:
+        metrics = Metrics()
+
+    results = WordleResults(keep, metrics=metrics)
+    cache = DecodeCache()
+    files = iter(email_files)
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        pending = deque(executor.submit(read_file, file_dir)
+                        for file_dir in islice(files, threads*EML_READ_AHEAD))
+        while pending:
+            raw_message = pending.popleft().result()
+            # Read the next file in place of the one being parsed
+            for file_dir in islice(files, 1):
+                pending.append(executor.submit(read_file, file_dir))
+            metrics.count('import', 'messages')
+            message = email.message_from_bytes(raw_message)
+            for result in extract_wordles(message, metrics, cache):
+                metrics.count('import', 'results')
+                results.add(*result)
+
+    return results
+
+
+def import_email_files_counted(email_files, threads=EML_READ_THREADS, keep=DUPLICATE_POLICY):
+    '''Runs import_email_files in a worker process, returns (result, metrics) as import_mbox_shard_counted'''
+    metrics = Metrics(quiet=True)
+    return import_email_files(email_files, threads, metrics, keep), metrics
+
+
+def import_eml_format(email_list_dir='Data/Wordle emails', workers=1, metrics=None, keep=DUPLICATE_POLICY):
+    '''
+    Import wordle data from each email in a folder of .eml files or a Maildir tree
+
+    Parameters:
+    email_list_dir (string): path of the folder
+    workers (int): number of worker processes parsing emails. 1 parses in this process,
+                   None uses one process per CPU. Each process reads its files with a pool of threads
+    metrics (Metrics): (optional) times the 'import' stage and counts decode paths and skipped messages
+    keep (string): duplicate policy, 'last' or 'first' (see WordleResults)
+
+    Returns:
+    wordle_result_dict (dict): {sender: {puzzle: grid}}, the same as importing the same
+                               messages from an mbox file
+    '''
+    if metrics is None:
+        metrics = Metrics()
+    if workers is None:
+        workers = cpu_count() or 1
+
+    with metrics.stage('import') as record:
+        email_files = find_email_files(email_list_dir)
+        record['items'] = len(email_files)
+
+        if workers == 1:
+            return import_email_files(email_files, metrics=metrics, keep=keep).results
+
+        # Split the files into a few chunks per worker, and merge the chunk results in order
+        num_chunks = min(workers*4, len(email_files)) or 1
+        chunks = [email_files[len(email_files)*i//num_chunks:len(email_files)*(i+1)//num_chunks]
+                  for i in range(num_chunks)]
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            chunk_results = list(executor.map(import_email_files_counted, chunks,
+                                              [EML_READ_THREADS]*len(chunks), [keep]*len(chunks)))
+
+        results = WordleResults(keep, metrics=metrics)
+        for chunk_result, chunk_metrics in chunk_results:
+            metrics.merge(chunk_metrics)
+            results.update(chunk_result)
+
+        return results.results
@@ -0,0 +1,97 @@
+'''Timers and counters for the import, convert and analysis stages'''
+
+# Import necessary libraries
+from contextlib import contextmanager
+import json
+import time
+
+
+class Metrics:
+    '''
+    Records how long each stage of a run takes and counts events within it, such as the
+    decode path each email took or why it was skipped.
+
+    Attributes:
+    stages (dict): {stage: {'seconds': total time, 'calls': number of runs, 'items': number of items
+                   processed (e.g. messages)}}
+    counters (dict): {counter: {key: count}}, e.g. {'decode': {'base64': 120, 'quoted-printable': 3}}
+    notes (dict): {name: [item, ...]} of events worth reporting one by one, e.g. conflicting results
+    hook (function): (optional) called with a dict describing each stage when it ends
+    quiet (bool): if True, progress and skip messages aren't printed
+    '''
+    def __init__(self, hook=None, quiet=False):
+        self.stages = {}
+        self.counters = {}
+        self.notes = {}
+        self.hook = hook
+        self.quiet = quiet
+
+    @contextmanager
+    def stage(self, name, items=None):
+        '''
+        Times a with block as one run of stage name
+
+        Parameters:
+        name (string): stage name
+        items (int): (optional) number of items processed. It can also be set (or updated)
+                     inside the block with record['items'] = n, using the yielded dict
+
+        Usage:
+        with metrics.stage('import') as record:
+            ...
+            record['items'] = num_messages
+        '''
+        record = {'items': items}
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            seconds = time.perf_counter() - start
+            totals = self.stages.setdefault(name, {'seconds': 0.0, 'calls': 0, 'items': 0})
+            totals['seconds'] += seconds
+            totals['calls'] += 1
+            totals['items'] += record['items'] or 0
+            if self.hook is not None:
+                self.hook(dict(stage_summary(seconds, record['items']), stage=name))
+
+    def count(self, counter, key, n=1):
+        '''Adds n to the count of key in counter'''
+        counts = self.counters.setdefault(counter, {})
+        counts[key] = counts.get(key, 0) + n
+
+    def note(self, name, item):
+        '''Adds item (anything that can be saved as JSON) to the list of notes name'''
+        self.notes.setdefault(name, []).append(item)
+
+    def merge(self, other):
+        '''Adds the counters and notes of other, recorded elsewhere (e.g. by a worker process)'''
+        for counter, counts in other.counters.items():
+            for key, n in counts.items():
+                self.count(counter, key, n)
+        for name, items in other.notes.items():
+            self.notes.setdefault(name, []).extend(items)
+
+    def log(self, *args):
+        '''Prints a message, unless quiet'''
+        if not self.quiet:
+            print(*args)
+
+    def as_dict(self):
+        '''
+        Returns:
+        {'stages': {stage: {'seconds', 'calls', 'items', 'items_per_sec'}}, 'counters': {...}, 'notes': {...}}
+        '''
+        stages = {name: dict(totals, **stage_summary(totals['seconds'], totals['items']))
+                  for name, totals in self.stages.items()}
+        return {'stages': stages, 'counters': self.counters, 'notes': self.notes}
+
+    def save(self, json_dir):
+        '''Saves as_dict() as a .json file'''
+        with open(json_dir, 'w') as outfile:
+            json.dump(self.as_dict(), outfile, indent=4)
+
+
+def stage_summary(seconds, items):
+    '''Seconds, items and throughput (items per second, None if unknown) of one stage'''
+    items_per_sec = items / seconds if items and seconds > 0 else None
+    return {'seconds': seconds, 'items': items, 'items_per_sec': items_per_sec}
@@ -0,0 +1,221 @@
+'''Runs the standard analyses of one or more Wordle groups in one batch and saves the results'''
+
+# Import necessary libraries
+from os import makedirs, path
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import json
+import pandas as pd
+from wordlemodule import WordleData, render_grids
+from metricsmodule import Metrics
+
+# Window size of the rolling average report
+ROLLING_WINDOW = 20
+
+# Each report: (WordleData method, arguments, names of the tables it returns)
+REPORTS = {
+    'leaderboard': ('leaderboard', (), None),
+    'stats': ('stats', (), None),
+    'trend': ('trend', (), None),
+    'linear_reg': ('linear_reg', (), None),
+    'weekly': ('weekly', (), ('count', 'score', 'score_sem')),
+    'monthly': ('calendar', ('month',), ('count', 'score', 'score_sem')),
+    'rolling': ('rolling', (ROLLING_WINDOW,), None),
+    'puzz_avg': ('puzz_avg', (), None),
+    'cell_probabilities': ('cell_probabilities', (), None),
+    'letter_patterns': ('letter_patterns', (), None),
+}
+
+# Calendar buckets shared by the reports (see WordleData.buckets)
+REPORT_BUCKETS = ('weekday', 'month')
+
+# Number of threads running the analyses of one group
+REPORT_THREADS = 4
+
+# File formats the tables can be saved in
+REPORT_FORMATS = ('csv', 'parquet', 'json')
+
+
+def prepare(data, buckets=REPORT_BUCKETS):
+    '''
+    Builds the intermediates shared by several analyses once, before they run in parallel:
+    the attempted and failed masks, each player's compacted scores, the pattern codes, the
+    grid cell counts, the streaks and the calendar buckets. They are cached by data (see
+    wordlemodule.memoized).
+    '''
+    data.attempted()
+    data.failed()
+    data.compacted()
+    data.pattern_index()
+    data.cell_counts()
+    data.streaks()
+    data.live()
+    for bucket in buckets:
+        data.buckets(bucket)
+
+
+def run_analyses(data, reports=None, threads=REPORT_THREADS):
+    '''
+    Runs analyses of one group with a pool of threads, after building their shared intermediates
+
+    Parameters:
+    data (WordleData): the group's data
+    reports (list): names of the reports to run (keys of REPORTS), all of them if None
+    threads (int): number of threads
+
+    Returns:
+    dict of {report name: result of the WordleData method}, in the order of reports
+    '''
+    if reports is None:
+        reports = list(REPORTS)
+    unknown = [name for name in reports if name not in REPORTS]
+    if unknown:
+        raise ValueError(f'Unknown reports {unknown}, expected some of {list(REPORTS)}')
+
+    with data.stage('prepare'):
+        prepare(data)
+
+    def run(name):
+        method, args, table_names = REPORTS[name]
+        return getattr(data, method)(*args)
+
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        return dict(zip(reports, executor.map(run, reports)))
+
+
+def report_tables(name, result):
+    '''
+    Converts the result of a report to dataframes
+
+    Returns:
+    dict of {table name: dataframe}, one table for a dataframe result, one per item of
+    a tuple result (named after the report's table names in REPORTS)
+    '''
+    method, args, table_names = REPORTS[name]
+
+    if name == 'puzz_avg':
+        # One row per player (or 'Average') and grid position
+        rows = [{'Person': person, 'Guess': guess + 1, 'Letter': letter + 1, 'Mean': avg[guess, letter]}
+                for person, avg in result.items() for guess in range(6) for letter in range(5)]
+        return {name: pd.DataFrame(rows)}
+
+    if name == 'cell_probabilities':
+        rows = [{'Person': person, 'Guess': guess + 1, 'Letter': letter + 1,
+                 'Grey': prob[guess, letter, 0], 'Yellow': prob[guess, letter, 1], 'Green': prob[guess, letter, 2]}
+                for person, prob in result.items() for guess in range(6) for letter in range(5)]
+        return {name: pd.DataFrame(rows)}
+
+    if name == 'letter_patterns':
+        # One row per guess and rank of its most frequent patterns
+        patterns, freq = result
+        num_ranks = patterns.shape[0]
+        # Render every pattern at once, as a 1x5 grid, in guess then rank order
+        rendered = render_grids(patterns.transpose(2,0,1).reshape(-1,5).T[None])
+        rows = [{'Guess': guess + 1, 'Rank': rank + 1, 'Pattern': rendered[guess*num_ranks + rank],
+                 'Frequency': freq[rank,0,guess]}
+                for guess in range(6) for rank in range(num_ranks) if freq[rank,0,guess] > 0]
+        return {name: pd.DataFrame(rows)}
+
+    if isinstance(result, tuple):
+        return {f'{name}_{table}': df for table, df in zip(table_names, result)}
+    return {name: result}
+
+
+def write_tables(tables, report_dir, formats=('csv',)):
+    '''
+    Saves tables in report_dir: a .csv and/or .parquet file per table, and/or all the tables
+    in one Report.json file ({table name: {'index', 'columns', 'data'}})
+
+    Parameters:
+    tables (dict): {table name: dataframe}
+    report_dir (string): directory to save the files in (created if needed)
+    formats (list): some of 'csv', 'parquet' and 'json'
+    '''
+    makedirs(report_dir, exist_ok=True)
+    for name, df in tables.items():
+        if 'csv' in formats:
+            df.to_csv(path.join(report_dir, name + '.csv'))
+        if 'parquet' in formats:
+            # Parquet columns must be named by strings
+            df.rename(columns=str).to_parquet(path.join(report_dir, name + '.parquet'))
+
+    if 'json' in formats:
+        report = {name: json.loads(df.to_json(orient='split')) for name, df in tables.items()}
+        with open(path.join(report_dir, 'Report.json'), 'w') as outfile:
+            json.dump(report, outfile, indent=4, ensure_ascii=False)
+
+
+def run_report(store_dir, report_dir, reports=None, formats=('csv',), threads=REPORT_THREADS, metrics=None):
+    '''
+    Runs the reports of one group and saves their tables (see write_tables)
+
+    Parameters:
+    store_dir: the group's data, as accepted by WordleData (e.g. the path of a store file)
+    report_dir (string): directory to save the tables in
+    reports (list): names of the reports to run (keys of REPORTS), all of them if None
+    formats (list): file formats, some of REPORT_FORMATS
+    threads (int): number of threads running the analyses
+    metrics (Metrics): (optional) times loading, preparing, each analysis and saving
+
+    Returns:
+    tables (dict): {table name: dataframe}
+    '''
+    check_formats(formats)
+    if metrics is None:
+        metrics = Metrics()
+
+    data = store_dir if isinstance(store_dir, WordleData) else WordleData(store_dir, metrics)
+    results = run_analyses(data, reports, threads)
+
+    tables = {}
+    for name, result in results.items():
+        tables.update(report_tables(name, result))
+
+    with metrics.stage('save', items=len(tables)):
+        write_tables(tables, report_dir, formats)
+    return tables
+
+
+def run_report_counted(store_dir, report_dir, reports=None, formats=('csv',), threads=REPORT_THREADS):
+    '''Runs run_report in a worker process, returns (table names, stage times) of the group'''
+    metrics = Metrics(quiet=True)
+    tables = run_report(store_dir, report_dir, reports, formats, threads, metrics)
+    return list(tables), metrics.as_dict()['stages']
+
+
+def run_group_reports(groups, report_dir, reports=None, formats=('csv',), workers=None, threads=REPORT_THREADS):
+    '''
+    Runs the reports of several groups, one worker process per group at a time, and
+    saves each group's tables in its own sub-directory of report_dir
+
+    Parameters:
+    groups (dict): {group name: the group's data, e.g. the path of its store file}
+    report_dir (string): directory for the group sub-directories
+    reports, formats, threads: see run_report
+    workers (int): number of worker processes (None = one per CPU)
+
+    Returns:
+    dataframe with one row per group and stage, with the time each stage took
+    '''
+    check_formats(formats)
+    names = list(groups)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(run_report_counted,
+                                    [groups[name] for name in names],
+                                    [path.join(report_dir, name) for name in names],
+                                    [reports]*len(names),
+                                    [formats]*len(names),
+                                    [threads]*len(names)))
+
+    rows = [dict(totals, group=name, stage=stage, tables=len(tables))
+            for name, (tables, stages) in zip(names, results) for stage, totals in stages.items()]
+    return pd.DataFrame(rows)
+
+
+def check_formats(formats):
+    '''Raises an error for unknown formats, or for parquet if pandas has no parquet engine'''
+    unknown = [file_format for file_format in formats if file_format not in REPORT_FORMATS]
+    if unknown:
+        raise ValueError(f'Unknown report formats {unknown}, expected some of {list(REPORT_FORMATS)}')
+    if 'parquet' in formats:
+        # Raises ImportError if neither pyarrow nor fastparquet is installed
+        pd.io.parquet.get_engine('auto')
@@ -1,33 +1,591 @@
+# pandas and scipy are only imported by the methods that return dataframes or p-values,
+# so the numpy core (and the command line tool, see main) starts quickly
 import numpy as np
-import pandas as pd
-from math import ceil
-import re
-from scipy.stats import pearsonr
-from sklearn.linear_model import LinearRegression
+import sys
+import json
+import pickle
+import struct
+import argparse
+import inspect
+import html
+from os import path, replace
+from email.utils import parseaddr
 import warnings
+from collections import OrderedDict
+from contextlib import nullcontext
+from functools import wraps
+
+# Unicode code points of the gray, yellow and green boxes, in order of their int representation 1-3
+BOX_CODE_POINTS = np.array([11036, 129000, 129001], dtype='<u4')
+
+# Lookup table from the int representation 0-3 of a cell to the code point it is shown with
+# (an empty box for unused guesses, see int_to_char)
+GRID_CODE_POINTS = np.array([9744, 11036, 129000, 129001], dtype='<u4')
+
+# Keys of a PuzzleStore saved as a dictionary (see PuzzleStore.to_dict)
+STORE_COLUMNS = {'players', 'player_id', 'puzzle_num', 'grid'}
+
+# Date of Wordle puzzle # 0 (a Saturday)
+PUZZLE_0_DATE = np.datetime64('2021-06-19')
+
+# Labels of the weekday calendar buckets (numpy weekday order)
+WEEKDAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+# Text file of 'email address:name' lines, and the alias index compiled from it (see AliasIndex)
+EMAIL_NAMES_DIR = 'Misc/Email names.txt'
+ALIAS_INDEX_DIR = 'Misc/Email names index.json'
+
+# Store file read by the command line tool (see main) unless another one is given
+STORE_DIR = 'Data/Script data/Imported_email_data.wordle'
+
+# Number of results converted at a time when streaming (see PuzzleStore.from_records)
+STREAM_BATCH_SIZE = 10000
+
+# Number of puzzles unpacked at a time when counting grid cells (see grid_cell_counts)
+CELL_COUNT_CHUNK_SIZE = 65536
+
+# Binary store file format (see PuzzleStore.save)
+STORE_MAGIC = b'WRDL'
+STORE_VERSION = 2
+STORE_HEADER = struct.Struct('<4sHxxQQ')
+STORE_TABLE_DTYPE = np.dtype([('start', '<u8'), ('count', '<u8'), ('name_len', '<u8')])
+
+# Bit offsets of each of the 30 cells and 6 rows in a packed grid (see pack_grids)
+GRID_SHIFTS = np.arange(0, 60, 2, dtype=np.uint64)
+ROW_SHIFTS = np.arange(0, 60, 10, dtype=np.uint64)
+
+# A packed row of 5 green boxes (3 = 0b11 in each of the 5 cells)
+SOLVED_ROW = np.uint64(0b1111111111)
+
+# Lookup table from a packed row (first letter in the lowest bits) to its pattern code
+# (first letter most significant, see PatternIndex)
+_packed_rows = np.arange(1024)
+PACKED_ROW_TO_CODE = sum(((_packed_rows >> (2*col)) & 3) << (2*(4-col)) for col in range(5)).astype(np.uint16)
+
+class PuzzleStore:
+    '''
+    A compact columnar store of Wordle puzzles, with one entry per puzzle actually played.
+
+    Each 6x5 grid of ints 0-3 is packed 2 bits per cell into a single uint64 (see pack_grids),
+    so memory scales with the number of puzzles played rather than players x highest puzzle number.
+
+    Attributes:
+    players (list): player names, indexed by player_id
+    player_id (ndarray): int32 index into players for each puzzle
+    puzzle_num (ndarray): int32 Wordle puzzle number for each puzzle
+    grid (ndarray): uint64 packed 6x5 grid for each puzzle
+    score (ndarray): uint8 solve score of each grid (see solve_scores, 0 for an empty grid)
+    player_start (ndarray): (optional) if each player's puzzles are stored contiguously,
+                            the index of each player's first puzzle (as in stores opened with load)
+    '''
+    def __init__(self, players, player_id, puzzle_num, grid, player_start=None, score=None):
+        self.players = list(players)
+        self.puzzle_num = np.asarray(puzzle_num, dtype=np.int32)
+        self.grid = np.asarray(grid, dtype=np.uint64)
+        self.player_start = None if player_start is None else np.asarray(player_start, dtype=np.int64)
+        self._player_id = None if player_id is None else np.asarray(player_id, dtype=np.int32)
+        self._score = None if score is None else np.asarray(score, dtype=np.uint8)
+        self._row_index = None
+
+    def __len__(self):
+        return len(self.grid)
+
+    @property
+    def player_id(self):
+        '''int32 index into players for each puzzle (built from player_start on first use if needed)'''
+        if self._player_id is None:
+            counts = np.diff(np.append(self.player_start, len(self)))
+            self._player_id = np.repeat(np.arange(len(self.players), dtype=np.int32), counts)
+        return self._player_id
+
+    @property
+    def score(self):
+        '''
+        uint8 solve score of each grid, 0 for an empty grid. Read from the store file for stores
+        opened with load(), so the grid column isn't read to find the scores, otherwise
+        calculated from the grids on first use.
+        '''
+        if self._score is None:
+            self._score = np.nan_to_num(solve_scores(self.grid)).astype(np.uint8)
+        return self._score
+
+    def player_rows(self, player):
+        '''Returns the rows of one player's puzzles: a slice for contiguous stores, otherwise a boolean mask'''
+        if self.player_start is not None:
+            stop = self.player_start[player+1] if player+1 < len(self.players) else len(self)
+            return slice(self.player_start[player], stop)
+        return self.player_id == player
+
+    def rename(self, players):
+        '''Returns the same store (sharing its arrays) with new player names'''
+        return PuzzleStore(players, self._player_id, self.puzzle_num, self.grid, self.player_start, self._score)
+
+    def save(self, store_dir):
+        '''
+        Saves the store in the binary store file format, which can be opened with load().
+
+        The file starts with a header (magic bytes, format version, number of players and
+        of puzzles) and a player table (first puzzle, number of puzzles and name length of
+        each player) followed by the UTF-8 player names. Then come the puzzle_num (int32),
+        grid (uint64) and score (uint8) columns, each 8 byte aligned and sorted by player and
+        puzzle number, so each player's puzzles are contiguous. Version 1 files have no score column.
+
+        The file is written next to store_dir and then moved over it, so a store memory
+        mapped from store_dir (e.g. PuzzleStore.load(store_dir).save(store_dir)) can be saved
+        back to the same path.
+
+        Parameters:
+        store_dir (string): path of the file to write
+        '''
+        # Sort puzzles so each player's puzzles are contiguous
+        order = np.lexsort((self.puzzle_num, self.player_id))
+        counts = np.bincount(self.player_id, minlength=len(self.players))
+        starts = np.cumsum(counts) - counts
+
+        names = [player.encode('utf-8') for player in self.players]
+        table = np.zeros(len(names), dtype=STORE_TABLE_DTYPE)
+        table['start'] = starts
+        table['count'] = counts
+        table['name_len'] = [len(name) for name in names]
+
+        temp_dir = store_dir + '.tmp'
+        with open(temp_dir, 'wb') as file:
+            file.write(STORE_HEADER.pack(STORE_MAGIC, STORE_VERSION, len(names), len(self)))
+            file.write(table.tobytes())
+            file.write(b''.join(names))
+            file.write(bytes(-file.tell() % 8))
+            file.write(self.puzzle_num[order].astype('<i4').tobytes())
+            file.write(bytes(-file.tell() % 8))
+            file.write(self.grid[order].astype('<u8').tobytes())
+            file.write(self.score[order].tobytes())
+        replace(temp_dir, store_dir)
+
+    @classmethod
+    def load(cls, store_dir):
+        '''
+        Opens a file written by save(). Only the header and player table are read, the
+        puzzle columns are memory mapped, so only the parts that are used are read from disk.
+
+        Parameters:
+        store_dir (string): path of the store file
+        '''
+        with open(store_dir, 'rb') as file:
+            magic, version, num_players, num_puzzles = STORE_HEADER.unpack(file.read(STORE_HEADER.size))
+            if magic != STORE_MAGIC:
+                raise ValueError(f'{store_dir} is not a Wordle store file')
+            if version not in (1, STORE_VERSION):
+                raise ValueError(f'{store_dir} has store format version {version}, expected {STORE_VERSION}')
+
+            table = np.frombuffer(file.read(num_players*STORE_TABLE_DTYPE.itemsize), dtype=STORE_TABLE_DTYPE)
+            names = file.read(int(table['name_len'].sum()))
+            offset = file.tell() + (-file.tell() % 8)
+
+        # Split the names blob
+        name_ends = np.cumsum(table['name_len'])
+        players = [names[end-length:end].decode('utf-8') for end, length in zip(name_ends, table['name_len'])]
+
+        # Memory map the columns
+        # Version 1 files have no score column, the scores are calculated from the grids when needed
+        score = None
+        if num_puzzles == 0:
+            puzzle_num = np.zeros(0, dtype='<i4')
+            grid = np.zeros(0, dtype='<u8')
+        else:
+            puzzle_num = np.memmap(store_dir, dtype='<i4', mode='r', offset=offset, shape=(num_puzzles,))
+            offset += num_puzzles*4
+            offset += -offset % 8
+            grid = np.memmap(store_dir, dtype='<u8', mode='r', offset=offset, shape=(num_puzzles,))
+            if version > 1:
+                offset += num_puzzles*8
+                score = np.memmap(store_dir, dtype='u1', mode='r', offset=offset, shape=(num_puzzles,))
+
+        return cls(players, None, puzzle_num, grid, player_start=table['start'], score=score)
+
+    @classmethod
+    def from_cubes(cls, cube_dict):
+        '''
+        Creates a store from dense per-player arrays
+
+        Parameters:
+        cube_dict (dict): player names with a 6x5xP int array of their puzzles, where
+                          all 0s means the puzzle was not attempted
+        '''
+        player_id, puzzle_num, grid = [], [], []
+        for idx, player in enumerate(cube_dict):
+            cube = cube_dict[player]
+            attempted = np.flatnonzero(np.reshape(cube, (30, -1)).any(axis=0))
+            player_id.append(np.full(len(attempted), idx))
+            puzzle_num.append(attempted)
+            grid.append(pack_grids(cube[:,:,attempted]))
+
+        return cls(cube_dict.keys(), np.concatenate(player_id or [[]]),
+                   np.concatenate(puzzle_num or [[]]), np.concatenate(grid or [[]]))
+
+    @classmethod
+    def from_result_dict(cls, result_dict):
+        '''
+        Creates a store from imported Wordle result strings
+
+        Parameters:
+        result_dict (dict): {sender: {puzzle number: Wordle result string}}
+
+        Returns:
+        store (PuzzleStore): the valid, attempted puzzles
+        skipped (list): (sender, puzzle number) of the malformed results that were left out
+        '''
+        players = [sender for sender in result_dict]
+        player_id, puzzle_num, guesses_list = [], [], []
+        for idx, sender in enumerate(players):
+            puzzles = list(result_dict[sender])
+            player_id.extend([idx]*len(puzzles))
+            puzzle_num.extend(int(puzz) for puzz in puzzles)
+            guesses_list.extend(result_dict[sender][puzz] for puzz in puzzles)
+
+        # Convert all results at once
+        grids, valid = decode_grids(guesses_list)
+        player_id = np.array(player_id, dtype=np.int32)
+        puzzle_num = np.array(puzzle_num, dtype=np.int32)
+
+        skipped = [(players[i], n) for i, n in zip(player_id[~valid], puzzle_num[~valid])]
+        store = cls(players, player_id[valid], puzzle_num[valid], pack_grids(grids[:,:,valid]))
+        return store, skipped
+
+    @classmethod
+    def from_records(cls, records, batch_size=STREAM_BATCH_SIZE):
+        '''
+        Creates a store from a stream of imported Wordle results, converting them to ints
+        in batches so only the packed grids are kept in memory
+
+        Parameters:
+        records (iterable): (sender, puzzle number, Wordle result string) tuples, in mailbox order.
+                            A later result for the same sender and puzzle replaces an earlier one
+        batch_size (int): number of results converted at a time
+
+        Returns:
+        store (PuzzleStore): the valid, attempted puzzles
+        skipped (list): (sender, puzzle number) of the malformed results that were left out
+        '''
+        player_ids = {}
+        player_id, puzzle_num, grid, valid = [], [], [], []
+
+        def convert_batch(batch):
+            grids, batch_valid = decode_grids([guesses for sender, puzz, guesses in batch])
+            player_id.append(np.array([player_ids[sender] for sender, puzz, guesses in batch], dtype=np.int32))
+            puzzle_num.append(np.array([int(puzz) for sender, puzz, guesses in batch], dtype=np.int32))
+            grid.append(pack_grids(grids))
+            valid.append(batch_valid)
+
+        batch = []
+        for sender, puzz, guesses in records:
+            player_ids.setdefault(sender, len(player_ids))
+            batch.append((sender, puzz, guesses))
+            if len(batch) == batch_size:
+                convert_batch(batch)
+                batch = []
+        convert_batch(batch)
+
+        player_id = np.concatenate(player_id)
+        puzzle_num = np.concatenate(puzzle_num)
+        grid = np.concatenate(grid)
+        valid = np.concatenate(valid)
+
+        # Keep only the last result for each sender and puzzle
+        keys = player_id.astype(np.int64) << 32 | puzzle_num.astype(np.int64)
+        _, last_reversed = np.unique(keys[::-1], return_index=True)
+        last = np.sort(len(keys) - 1 - last_reversed)
+
+        players = list(player_ids)
+        skipped = [(players[player_id[i]], puzzle_num[i]) for i in last[~valid[last]]]
+        last = last[valid[last]]
+        return cls(players, player_id[last], puzzle_num[last], grid[last]), skipped
+
+    def merge_players(self, names):
+        '''
+        Merges players that share a name (e.g. one person's email addresses) into one player
+
+        When more than one of the merged players has a result for the same puzzle, the result
+        of the player that comes last in players is kept, as if their results were imported
+        after the others'.
+
+        Parameters:
+        names (list): new name of each player
+
+        Returns:
+        store (PuzzleStore): the merged store, its players in order of their first name in names
+        conflicts (int): number of puzzles left out because another alias had a different grid
+        '''
+        new_names = list(dict.fromkeys(names))
+        if len(new_names) == len(names):
+            return self.rename(names), 0
+
+        new_index = {name: idx for idx, name in enumerate(new_names)}
+        old_to_new = np.array([new_index[name] for name in names], dtype=np.int32)
+        new_player_id = old_to_new[self.player_id]
+
+        # Sort by new player, puzzle and old player, and keep the last row of each new player and puzzle
+        keys = new_player_id.astype(np.int64) << 32 | self.puzzle_num.astype(np.int64)
+        order = np.lexsort((self.player_id, keys))
+        is_last = np.append(keys[order][1:] != keys[order][:-1], True) if len(keys) else np.zeros(0, dtype=bool)
+        kept = order[is_last]
+
+        # A dropped row conflicts if its grid differs from the kept row of the same puzzle
+        kept_of_row = np.repeat(kept, np.diff(np.append(0, np.flatnonzero(is_last) + 1)))
+        conflicts = int(np.count_nonzero(self.grid[order] != self.grid[kept_of_row]))
+
+        kept = np.sort(kept)
+        score = None if self._score is None else self._score[kept]
+        return PuzzleStore(new_names, new_player_id[kept], self.puzzle_num[kept], self.grid[kept], score=score), conflicts
+
+    def cube(self, player, num_puzzles=None):
+        '''Returns the dense 6x5xnum_puzzles uint8 array of one player's puzzles (by index or name)'''
+        if not isinstance(player, (int, np.integer)):
+            player = self.players.index(player)
+        if num_puzzles is None:
+            num_puzzles = self.puzzle_num.max() + 1 if len(self) else 0
+
+        rows = self.player_rows(player)
+        cube = np.zeros([6,5,num_puzzles], dtype='uint8')
+        cube[:,:,self.puzzle_num[rows]] = unpack_grids(self.grid[rows])
+        return cube
+
+    def to_dict(self):
+        '''Returns the store as a plain dictionary of its columns, e.g. for pickling'''
+        return {'players': self.players,
+                'player_id': self.player_id,
+                'puzzle_num': self.puzzle_num,
+                'grid': self.grid}
+
+    def select(self, rows):
+        '''Returns a new store with only the puzzles selected by rows (boolean mask or indices)'''
+        score = None if self._score is None else self._score[rows]
+        return PuzzleStore(self.players, self.player_id[rows], self.puzzle_num[rows], self.grid[rows], score=score)
+
+    def find(self, player, puzzle):
+        '''
+        Returns the row of player's result for puzzle, or None if it is not in the store.
+        The rows are indexed by (player, puzzle) on first use and append() keeps the index
+        up to date, so each lookup after the first is O(1).
+        '''
+        if self._row_index is None:
+            # Later rows replace earlier ones for the same player and puzzle
+            keys = zip(self.player_id.tolist(), self.puzzle_num.tolist())
+            self._row_index = {key: row for row, key in enumerate(keys)}
+        return self._row_index.get((int(player), int(puzzle)))
+
+    def reserve(self, size):
+        '''
+        Makes sure the store's arrays are writable and can grow to size puzzles without
+        being copied. Capacity is doubled when it runs out, so appending is amortized O(1).
+        Stores opened with load() are copied out of the (read only) file on first use.
+        '''
+        capacity = len(self._grid_buffer) if hasattr(self, '_grid_buffer') else 0
+        if size <= capacity and self.grid.base is self._grid_buffer:
+            return
+        capacity = max(size, 2*capacity, 16)
+        num = len(self)
+        buffers = []
+        for values in (self.player_id, self.puzzle_num, self.grid, self.score):
+            buffer = np.zeros(capacity, dtype=values.dtype)
+            buffer[:num] = values
+            buffers.append(buffer)
+        self._player_id_buffer, self._puzzle_num_buffer, self._grid_buffer, self._score_buffer = buffers
+        self._player_id = self._player_id_buffer[:num]
+        self.puzzle_num = self._puzzle_num_buffer[:num]
+        self.grid = self._grid_buffer[:num]
+        self._score = self._score_buffer[:num]
+
+        # Appended puzzles can belong to any player, so rows are found with player_id from now on
+        self.player_start = None
+
+    def append(self, player, puzzle, grid):
+        '''
+        Adds one puzzle to the end of the store
+
+        Parameters:
+        player (int): index into players
+        puzzle (int): puzzle number
+        grid (uint64): packed grid (see pack_grids)
+
+        Returns:
+        the row of the new puzzle
+        '''
+        num = len(self)
+        self.reserve(num + 1)
+        self._player_id_buffer[num] = player
+        self._puzzle_num_buffer[num] = puzzle
+        self._grid_buffer[num] = grid
+        self._score_buffer[num] = np.nan_to_num(solve_scores([grid])[0])
+        self._player_id = self._player_id_buffer[:num+1]
+        self.puzzle_num = self._puzzle_num_buffer[:num+1]
+        self.grid = self._grid_buffer[:num+1]
+        self._score = self._score_buffer[:num+1]
+        if self._row_index is not None:
+            self._row_index[(int(player), int(puzzle))] = num
+        return num
+
+
+class AliasIndex:
+    '''
+    The names the user chose for email addresses, read from a text file of
+    'email address:name' lines, e.g. 'HPotter456@aol.com:Harry'. Several addresses can have
+    the same name. Addresses are compared case-insensitively, and a sender can be given as
+    'Name <address>' or just the address.
+
+    The parsed index is saved next to the text file and is only rebuilt when the file changes.
+
+    Attributes:
+    aliases (dict): {lower case email address: name}
+    '''
+    def __init__(self, aliases=None):
+        self.aliases = {} if aliases is None else aliases
+
+    @classmethod
+    def load(cls, names_dir=EMAIL_NAMES_DIR, index_dir=ALIAS_INDEX_DIR):
+        '''
+        Opens the alias index of a names file, compiling it if the saved index is missing or
+        out of date. A missing names file gives an empty index, so every sender keeps its address.
+
+        Parameters:
+        names_dir (string): path of the names .txt file
+        index_dir (string): path of the compiled index .json file (None to not save it)
+        '''
+        try:
+            source = path.getmtime(names_dir), path.getsize(names_dir)
+        except OSError:
+            return cls()
+
+        if index_dir is not None and path.exists(index_dir):
+            with open(index_dir, 'r') as file:
+                index = json.load(file)
+            if index.get('source') == list(source):
+                return cls(index['aliases'])
+
+        aliases = cls.parse(names_dir)
+        if index_dir is not None:
+            try:
+                with open(index_dir, 'w') as file:
+                    json.dump({'source': list(source), 'aliases': aliases.aliases}, file, indent=4)
+            except OSError:
+                pass
+        return aliases
+
+    @classmethod
+    def parse(cls, names_dir):
+        '''Reads a names file (see AliasIndex), skipping blank lines and lines without a ':' '''
+        aliases = {}
+        with open(names_dir, 'r') as file:
+            for line in file:
+                address, colon, name = line.strip().partition(':')
+                if not colon:
+                    continue
+                aliases[cls.address(address)] = name.strip()
+        return cls(aliases)
+
+    @staticmethod
+    def address(sender):
+        '''The lower case email address of a sender, e.g. 'Harry <HPotter456@aol.com>' -> 'hpotter456@aol.com' '''
+        address = parseaddr(sender)[1] or sender
+        return address.strip().lower()
+
+    def names(self, senders):
+        '''
+        Returns:
+        list of the name of each sender: the user's name for their address, or else the address
+        '''
+        return [self.aliases.get(self.address(sender), parseaddr(sender)[1] or sender) for sender in senders]
+
+
+def memoized(maxsize=1, copy=True):
+    '''
+    Decorator that caches the results of a WordleData method, keyed on the call arguments
+    with defaults filled in, so e.g. rolling(20) and rolling(mywindow=20) share a result.
+    Cached results are only used while the object's data version is unchanged (see
+    WordleData.invalidate), and at most maxsize argument combinations are kept (least
+    recently used are dropped first). Unhashable arguments bypass the cache.
+
+    Parameters:
+    maxsize (int): number of cached results per method and object
+    copy (bool): return a copy of cached results (dataframes, arrays, and dicts/tuples of them),
+                 so the caller can modify them without changing the cache
+    '''
+    def decorator(method):
+        signature = inspect.signature(method)
+
+        @wraps(method)
+        def wrapper(self, *args, **kwargs):
+            try:
+                bound = signature.bind(self, *args, **kwargs)
+                bound.apply_defaults()
+                key = tuple(bound.arguments.items())[1:]
+                hash(key)
+            except TypeError:
+                return method(self, *args, **kwargs)
+
+            cache = self._cache.setdefault(method.__name__, OrderedDict())
+            entry = cache.get(key)
+            if entry is not None and entry[0] == self.version:
+                cache.move_to_end(key)
+                result = entry[1]
+            else:
+                with self.stage(method.__name__):
+                    result = method(self, *args, **kwargs)
+                cache[key] = (self.version, result)
+                cache.move_to_end(key)
+                while len(cache) > maxsize:
+                    cache.popitem(last=False)
+
+            return copy_result(result) if copy else result
+        return wrapper
+    return decorator
+
+def copy_result(result):
+    '''Copies dataframes and arrays, including inside tuples and dicts'''
+    if isinstance(result, tuple):
+        return tuple(copy_result(item) for item in result)
+    if isinstance(result, dict):
+        return {key: copy_result(value) for key, value in result.items()}
+
+    # Results can only be dataframes if pandas has been imported
+    pd = sys.modules.get('pandas')
+    copyable = (np.ndarray,) if pd is None else (pd.DataFrame, pd.Series, np.ndarray)
+    if isinstance(result, copyable):
+        return result.copy()
+    return result
+
 
 class WordleData:
     '''
     A class for manipulation of Wordle data and associated meta-data.
     '''
-    def __init__(self,myData):
+    def __init__(self,myData, metrics=None):
         '''
         Initializes the WordleData object by extracting data from myData, calculating various constants, and converting it to a numpy array.
 
         Parameters:
-        myData (dict): a dictionary of player names, with a second level dictionary of their scores
+        myData (dict, PuzzleStore or string): a dictionary of player names, with a second level dictionary of their scores,
+                                      a PuzzleStore (or its to_dict() dictionary), or the path of a store file
+        metrics (metricsmodule.Metrics): (optional) times loading the data ('load' stage) and each
+                                         analysis that isn't already cached (one stage per method)
         '''
 
-        # Extract the int representation from dict
-        self.extract_data(myData)
+        # Results of analysis methods are cached until the data changes (see memoized)
+        self._cache = {}
+        self.version = 0
+        self.metrics = metrics
 
-        # Clean names of senders
-        self.clean_sender_names()
-        
-        # Convert dictionary to array of solve scores, with one column per sender
-        self.MAX_PUZZ_NUM = self.num_puzzles()
-        self.NUM_SENDERS = self.num_senders()
-        self.convert_to_arr()
+        with self.stage('load') as record:
+            # Extract the int representation from dict
+            self.extract_data(myData)
+
+            # Clean names of senders
+            self.clean_sender_names()
+
+            # Convert dictionary to array of solve scores, with one column per sender
+            self.FIRST_PUZZ_NUM = 0
+            self.MAX_PUZZ_NUM = self.num_puzzles()
+            self.NUM_SENDERS = self.num_senders()
+            self.convert_to_arr()
+            record['items'] = len(self.store)
 
         warnings.filterwarnings('ignore')
 
@@ -38,64 +596,194 @@ class WordleData:
 
     def extract_data(self, myData):
         '''
-        Save the integer representation of the wordle puzzles in its own dict
+        Save the integer representation of the wordle puzzles in a PuzzleStore
 
         Parameters:
-        myData (dict): a dictionary of player names, with a second level dictionary of their scores
+        myData (dict, PuzzleStore or string): a dictionary of player names, with a second level dictionary of their scores,
+                                      a PuzzleStore (or its to_dict() dictionary), or the path of a store file
 
         Returns:
-        self.data_dict (dict): a one-level dictionary of player scores
+        self.store (PuzzleStore): the attempted puzzles of every player
         '''
-        self.data_dict = {}
-        for sender in myData:
-            self.data_dict[sender] = myData[sender]['0']
-    
+        if isinstance(myData, PuzzleStore):
+            self.store = myData
+        elif isinstance(myData, str):
+            self.store = PuzzleStore.load(myData)
+        elif STORE_COLUMNS.issubset(myData):
+            self.store = PuzzleStore(**myData)
+        else:
+            self.store = PuzzleStore.from_cubes({sender: myData[sender]['0'] for sender in myData})
+
+    @property
+    def data_arr(self):
+        '''Array of solve scores, row index corresponds to puzzle number, columns correspond to players'''
+        return self._data_arr
+
+    @data_arr.setter
+    def data_arr(self, value):
+        self._data_arr = value
+        self.invalidate()
+
+    def stage(self, name):
+        '''Times a with block as stage name of self.metrics, if there is one'''
+        if self.metrics is None:
+            return nullcontext({'items': None})
+        return self.metrics.stage(name)
+
+    def invalidate(self):
+        '''
+        Marks the data as changed, so cached analysis results are recalculated.
+        Called automatically when data_arr is replaced, call it after changing
+        data_arr or the store in place.
+        '''
+        self.version += 1
+        self._cache.clear()
 
-    def clean_sender_names(self):
+    def append(self, player, puzzle, grid):
         '''
-        Opens a text file supplied by the user which specifies 
-        names to use instead of email addresses in the data analysis.
-        If no names are provided, the email address is used.
+        Adds one result as it arrives, without rebuilding from the whole data set. data_arr and
+        the store grow by doubling their capacity, the live aggregates (see live) are updated
+        in O(1) and cached analysis results are invalidated.
 
-        Paramaters:
-        name_dir (string): directory of .txt file with names:emails
+        Parameters:
+        player (string): player name, a new column is added for unknown players
+        puzzle (int): puzzle number
+        grid: the Wordle result string, a 6x5 int array or a packed uint64 grid.
+              A result for a puzzle the player already has replaces it.
 
         Returns:
-        self.data_dict (dict): replaced old keys (email addresses) with names 
+        the solve score of the result
+        '''
+        if isinstance(grid, str):
+            grids, valid = decode_grids([grid])
+            if not valid[0]:
+                raise ValueError('Malformed Wordle result for puzzle ' + str(puzzle))
+            packed = pack_grids(grids)[0]
+        elif np.ndim(grid) == 2:
+            packed = pack_grids(np.asarray(grid)[:,:,None])[0]
+        else:
+            packed = np.uint64(grid)
+        score = solve_scores([packed])[0]
+        if np.isnan(score):
+            raise ValueError('Empty Wordle result for puzzle ' + str(puzzle))
+
+        # Build the aggregates from the existing data before it changes
+        live = self.live()
+
+        if player in self.players:
+            player_idx = self.players.index(player)
+        else:
+            self.players.append(player)
+            player_idx = live.add_player()
+        self.reserve(max(puzzle + 1, self.MAX_PUZZ_NUM), len(self.players))
+
+        old_score = self.data_arr[puzzle, player_idx]
+        self.data_arr[puzzle, player_idx] = score
+        if np.isnan(old_score):
+            self.store.append(player_idx, puzzle, packed)
+            live.extend_streak(player_idx, puzzle, self.data_arr[:,player_idx])
+        else:
+            row = self.store.find(player_idx, puzzle)
+            self.store.reserve(len(self.store))
+            live.remove(player_idx, puzzle, old_score, pattern_codes(self.store.grid[[row]])[:,0])
+            self.store.grid[row] = packed
+            self.store.score[row] = score
+        live.add(player_idx, puzzle, score, pattern_codes([packed])[:,0])
+
+        # Cached analyses are recalculated, but the live aggregates are already up to date
+        self.invalidate()
+        self._live_version = self.version
+        return score
+
+    def reserve(self, num_puzzles, num_players):
+        '''
+        Grows data_arr to num_puzzles rows and num_players columns of nan (not attempted).
+        data_arr is a view of a larger buffer whose capacity is doubled when it runs out,
+        so growing one puzzle or player at a time is amortized O(1).
         '''
+        buffer = getattr(self, '_data_buffer', None)
+        if buffer is None or self.data_arr.base is not buffer \
+                or num_puzzles > buffer.shape[0] or num_players > buffer.shape[1]:
+            old_rows, old_cols = self.data_arr.shape
+            shape = (max(num_puzzles, 2*old_rows if num_puzzles > old_rows else old_rows),
+                     max(num_players, 2*old_cols if num_players > old_cols else old_cols))
+            buffer = np.full(shape, np.nan)
+            buffer[:old_rows,:old_cols] = self.data_arr
+            self._data_buffer = buffer
+        self._data_arr = self._data_buffer[:num_puzzles,:num_players]
+        self.MAX_PUZZ_NUM = num_puzzles
+        self.NUM_SENDERS = num_players
+
+    def live(self):
+        '''
+        Returns the LiveAggregates of the data, which append() keeps up to date.
+        They are built from the whole data set on first use and after bulk changes
+        (replacing data_arr or calling invalidate() directly).
+        '''
+        if getattr(self, '_live', None) is None or self._live_version != self.version:
+            self._live = LiveAggregates.from_data(self.data_arr, self.store, self.FIRST_PUZZ_NUM)
+            self._live_version = self.version
+        return self._live
 
-        # Create new dictionary to return with cleaned keys
-        temp_dict = {}
+    def leaderboard(self):
+        '''
+        Returns the live leaderboard from the aggregates kept up to date by append(): a dataframe
+        with one row per player of Mean solve score, Solve score standard deviation,
+        Puzzles attempted and Current streak, sorted by mean solve score (players with no
+        puzzles, e.g. in a view of puzzles they didn't play, come last with a nan mean)
+        '''
+        import pandas as pd
+        live = self.live()
+        results = pd.DataFrame({'Mean solve score': live.average(),
+                                'Solve score standard deviation': live.std(),
+                                'Puzzles attempted': live.count,
+                                'Current streak': live.current_streak(self.MAX_PUZZ_NUM - 1)},
+                               index=pd.Index(self.players, name='Person'))
+        return results.sort_values('Mean solve score')
+
+    @memoized(copy=False)
+    def attempted(self):
+        '''Boolean array the shape of data_arr, True where the puzzle was attempted (shared by several methods)'''
+        return ~np.isnan(self.data_arr)
+
+    @memoized(copy=False)
+    def failed(self):
+        '''Boolean array the shape of data_arr, True where the puzzle was attempted but not solved (7)'''
+        return self.data_arr == 7
+
+    @memoized(maxsize=8, copy=False)
+    def buckets(self, bucket='weekday'):
+        '''The calendar bucket of each puzzle number (row of data_arr) and the bucket labels (see calendar_buckets)'''
+        return calendar_buckets(self.puzzle_numbers(), bucket)
+
+    @memoized(copy=False)
+    def compacted(self):
+        '''Each player's solve scores moved to the top of data_arr in puzzle order, and their counts (see compact_columns)'''
+        return compact_columns(self.data_arr)
+
+    @property
+    def players(self):
+        '''List of player names, in column order of self.data_arr'''
+        return self.store.players
+
+    @property
+    def data_dict(self):
+        '''Dictionary of player names with a dense 6x5xMAX_PUZZ_NUM array of their puzzles (built on request)'''
+        return {player: self.store.cube(i, self.MAX_PUZZ_NUM) for i, player in enumerate(self.players)}
 
-        # Open user-supplied .txt file with desired names for each email address
-        with open('Misc/Email names.txt','r') as file:
-            user_supplied_email_names = {}
-            for line in file:
-                user_supplied_e_address = re.search('.*:',line.rstrip())
-                user_supplied_name = re.search(':.*',line.rstrip())
-                user_supplied_email_names[user_supplied_e_address.group()[0:-1]] = user_supplied_name.group()[1:]
-
-        # For each sender, get their email address and replace it with user-chosen name.
-        # If no user supplied name exists, the email address is used
-        for old_key in self.data_dict:
-
-            # Extract email address from old key
-            email_address = re.search('<(.*)>',old_key)
-            if email_address == None:
-                email_address = old_key
-            else:
-                email_address = email_address.group()
-                email_address = email_address[1:len(email_address)-1]
+    def clean_sender_names(self):
+        '''
+        Replaces each sender (email address) with the name the user chose for it in a
+        text file (see AliasIndex). If no name is provided, the email address is used.
+        Senders with the same name are merged into one player (see PuzzleStore.merge_players).
 
-            # If user supplied name, then replace the old key with the user_supplied_email_names
-            if email_address in user_supplied_email_names:
-                name = user_supplied_email_names[email_address]
-            else:
-                name = email_address
-            
-            # Copy Wordle score information from old dictionary to new one
-            temp_dict[name] = self.data_dict[old_key]
-        self.data_dict = temp_dict
+        Returns:
+        self.store (PuzzleStore): replaced old player names (email addresses) with names 
+        '''
+        names = AliasIndex.load().names(self.store.players)
+        self.store, conflicts = self.store.merge_players(names)
+        if conflicts and self.metrics is not None:
+            self.metrics.count('aliases', 'conflict', conflicts)
 
 
     def convert_to_arr(self):
@@ -104,7 +792,7 @@ class WordleData:
         with each column corresponding to a sender
 
         Parameters:
-        self.data_dict (dict): dictionary of player scores
+        self.store (PuzzleStore): the attempted puzzles of every player
         self.MAX_PUZZ_NUM (int): the highest numbered puzzle solved by any player
         self.NUM_SENDERS(int): the number of players
 
@@ -113,67 +801,82 @@ class WordleData:
                                     correspond to players, values are solve scores 
         '''
 
-        # Create an array of not a number, which will store puzzle solve scores
+        # Create an array of not a number, which will store puzzle solve scores.
+        # Puzzles not in the store were not attempted, and the value will remain as nan
         self.data_arr = np.full([self.MAX_PUZZ_NUM, self.NUM_SENDERS], np.nan)
 
-        for idx, sender in enumerate(self.data_dict):
-            # Sum across all rows
-            all_puzzles_arr_rowsum = np.sum(self.data_dict[sender], axis=1)
-
-            # If the sum across all rows is 0, then the puzzle was not attempted,
-            # and the value will remain as nan
-            puzzle_not_attempted = np.sum(all_puzzles_arr_rowsum, axis=0) == 0
-
-            # If the sum across all rows is 3*5=15, puzzle is solved at that row
-            # puzzle_solved_row is an array of [row of solving, puzzle number]
-            puzzle_solved_row = np.argwhere(all_puzzles_arr_rowsum == 15)
-            puzzle_solved_row[:,0] += 1     #convert 0-based array to 1-based wordle row
-
-            # Store puzzle solved row in col per sender
-            cols = puzzle_solved_row[:,1]
-            self.data_arr[cols,idx] = puzzle_solved_row[:,0]
-
-            # If was attempted but not solved, then assign row=7
-            idx_puzz_solved = ~np.isnan(self.data_arr[:,idx])
-            attempted_not_solved = ~puzzle_not_attempted & ~idx_puzz_solved
-            self.data_arr[attempted_not_solved,idx] = 7
+        # Puzzle is solved at the first row where all 5 letters are green (3),
+        # if attempted but not solved, then assign row=7. The scores are read from the
+        # store's score column, so the grids are only read by the analyses that use them
+        score = self.store.score
+        self.data_arr[self.store.puzzle_num, self.store.player_id] = np.where(score > 0, score, np.nan)
 
         return self.data_arr
          
     def num_senders(self):
         '''Calculate the number of players for which data is available'''
-        num_senders = len(self.data_dict)
+        num_senders = len(self.players)
         return num_senders
     
     # Find how many puzzles are in the array
     '''Calculate the highest number puzzle solved by any player'''
     def num_puzzles(self):
-        max_puzz_num = 0
-        for sender in self.data_dict:
-            curr_arr = self.data_dict[sender]
-            curr_len = np.shape(curr_arr)[2]
-
-            if curr_len > max_puzz_num:
-                max_puzz_num = curr_len
+        if len(self.store) == 0:
+            return 0
+        max_puzz_num = int(self.store.puzzle_num.max()) + 1
 
         return max_puzz_num
 
+    def puzzle_numbers(self):
+        '''Puzzle number of each row of data_arr'''
+        return np.arange(self.FIRST_PUZZ_NUM, self.MAX_PUZZ_NUM)
+
+    @memoized(copy=False)
+    def puzzle_index(self):
+        '''Returns the PuzzleIndex of all puzzles (built on first use)'''
+        return PuzzleIndex(self.store)
+
+    def between(self, start=None, end=None):
+        '''
+        Returns a view of the puzzles from start up to (not including) end, e.g. 2023 only with
+        between('2023-01-01', '2024-01-01'). The view is made in O(1) without copying the data
+        (see WordleDataView), and every analysis method can be called on it.
+
+        Parameters:
+        start, end: puzzle numbers or dates ('2023-01-01', datetime.date or numpy datetime64),
+                    None for no limit
 
+        Returns:
+        view (WordleDataView): the puzzles in the range, which is clipped to the puzzles of the data
+
+        Raises:
+        ValueError: if no puzzle of the data is in the range
+        '''
+        first, last = self.FIRST_PUZZ_NUM, self.MAX_PUZZ_NUM
+        if start is not None:
+            first = max(first, puzzle_number(start))
+        if end is not None:
+            last = min(last, puzzle_number(end))
+        if first >= last:
+            raise ValueError(f'No puzzles between {start} and {end}, the data has puzzles '
+                             f'{self.FIRST_PUZZ_NUM} to {self.MAX_PUZZ_NUM - 1}')
+        return WordleDataView(self, first, last)
+
+
+    @memoized()
     def weekly(self):
         '''
-        This function uses the array of solve scores from each player to create
-        a pandas dataframe, and adds an extra column to track day of the week.
+        This function uses the array of solve scores from each player to calculate
+        statistics for each day of the week (see calendar).
 
         Returns:
         df_weekly_sum (dataframe): number of puzzles completed by each player for each day of the week
         df_weekly_score (dataframe): mean solve score for each player for each day of the week
         df_weekly_score_sem (dataframe): standard error of the mean
         '''
-        # Create dataframe
-        df = pd.DataFrame(self.data_arr, columns=self.data_dict.keys())
+        df_weekly_sum, df_weekly_score, df_weekly_score_sem = self.calendar('weekday')
 
-        # Find puzzle number of known day of the week
-        # Puzzle # 0 --> Saturday, 19 June 2021
+        # Reorder the dataframes to start on the day of puzzle # 0 (Saturday)
         days = ['Saturday',
                 'Sunday',
                 'Monday',
@@ -181,31 +884,41 @@ class WordleData:
                 'Wednesday',
                 'Thursday',
                 'Friday']
-        days_repeated = days*ceil((len(self.data_arr)/7))
-        days_forpd = days_repeated[0:len(self.data_arr)]
+        results = []
+        for df in (df_weekly_sum, df_weekly_score, df_weekly_score_sem):
+            df = df.reindex(days)
+            df.index.name = 'Day of the week'
+            results.append(df)
 
-        # Add days to dataframe
-        df['Day of the week'] = days_forpd
+        return tuple(results)
 
-        # Calculate how many puzzles were solved each day of the week
-        df_weekly_sum = pd.DataFrame()
-        df_weekly_score = pd.DataFrame()
-        df_weekly_score_sem = pd.DataFrame()
-
-        for mykey in self.data_dict.keys():
-            df_weekly_sum[mykey] = df[[mykey,'Day of the week']].dropna().groupby('Day of the week',sort=False).size()
+    @memoized(maxsize=8)
+    def calendar(self, bucket='weekday'):
+        '''
+        Calculates statistics of the solve scores of each player grouped by the date of the puzzle,
+        for all players at once
 
-            # Replace scores of 7 (failed wordle) with Nan, which will be ignored in calculating mean
-            df_weekly_score[mykey] = df[[mykey,'Day of the week']].replace([7], np.nan).dropna().groupby('Day of the week',sort=False).mean()
-            df_weekly_score_sem[mykey] = df[[mykey,'Day of the week']].replace([7], np.nan).dropna().groupby('Day of the week',sort=False).sem()
+        Parameters:
+        bucket (string): how to group puzzle dates, one of 'weekday' (Monday-Sunday), 'weekend'
+                         (Weekday or Weekend), 'isoweek' (e.g. 2023-W05), 'month' (e.g. 2023-02)
+                         or 'year'
 
-        # Reorder the dataframe Sun->Sat
-        df_weekly_sum = df_weekly_sum.reindex(days,level='Day of the week')
-        df_weekly_score = df_weekly_score.reindex(days,level='Day of the week')
-        df_weekly_score_sem = df_weekly_score_sem.reindex(days,level='Day of the week')
-        
-        return df_weekly_sum, df_weekly_score, df_weekly_score_sem
+        Returns:
+        df_count (dataframe): number of puzzles completed by each player (column) in each bucket (row)
+        df_score (dataframe): mean solve score, excluding failed puzzles (7)
+        df_score_sem (dataframe): standard error of the mean
+        '''
+        import pandas as pd
+        bucket_ids, labels = self.buckets(bucket)
+        count, mean, sem = bucket_stats(self.data_arr, bucket_ids, len(labels), self.attempted(), self.failed())
+
+        index = pd.Index(labels, name=bucket)
+        df_count = pd.DataFrame(count, index=index, columns=self.players)
+        df_score = pd.DataFrame(mean, index=index, columns=self.players)
+        df_score_sem = pd.DataFrame(sem, index=index, columns=self.players)
+        return df_count, df_score, df_score_sem
     
+    @memoized(maxsize=16)
     def rolling(self, mywindow):
         '''
         Calculates the rolling average solve score for each player
@@ -216,182 +929,250 @@ class WordleData:
         Returns:
         df_rolled (dataframe): the self.data_arr array, rolled
         '''
-        # Create dataframe
-        df = pd.DataFrame(self.data_arr, columns=self.data_dict.keys())
-        df_rolled = pd.DataFrame(np.nan, index=df.index, columns=df.columns)
+        return self.rolling_stats(mywindow)['mean']
 
+    @memoized(maxsize=16)
+    def rolling_stats(self, mywindow, std=False, ewm_alpha=None):
+        '''
+        Calculates rolling statistics of the solve score for each player in one pass.
+        Each player's statistics are over their last mywindow attempted puzzles, and puzzles
+        they didn't attempt get the value of their next attempted puzzle.
 
-        # Each df column has different numbers of NA when they didn't complete the puzzle,
-        # so in order to calculate the rolling average without including NA, 
-        # go through each column individually and join them together afterward
-        for mykey in df:
-            data_to_roll = df[mykey].dropna()
+        Parameters:
+        mywindow (int): the window size
+        std (bool): also calculate the rolling standard deviation
+        ewm_alpha (float): (optional) also calculate the exponentially weighted mean with this smoothing factor
 
-            if data_to_roll.size <= mywindow:
+        Returns:
+        dict of dataframes with keys 'mean' and, if requested, 'std' and 'ewm'
+        '''
+        import pandas as pd
+        # Players without enough puzzles are left as nan
+        compacted = self.compacted()
+        for mykey, size in zip(self.players, compacted[1]):
+            if size <= mywindow:
                 #warning
-                warnings.warn(f'{mykey} only has {data_to_roll.size} values, which is not enough to calculate using a sliding widow size of {mywindow}')
-                continue
+                warnings.warn(f'{mykey} only has {size} values, which is not enough to calculate using a sliding widow size of {mywindow}')
 
-            df_rolled[mykey] = data_to_roll.rolling(mywindow).mean().reindex(df.index, method='backfill')
+        results = rolling_stats(self.data_arr, mywindow, std, ewm_alpha, compacted)
+        index = pd.RangeIndex(self.FIRST_PUZZ_NUM, self.MAX_PUZZ_NUM)
+        return {stat: pd.DataFrame(results[stat], index=index, columns=self.players) for stat in results}
 
-        return df_rolled
+    def rolling_state(self, mywindow, ewm_alpha=None):
+        '''Returns a RollingState holding each player's last mywindow solve scores, for online updates'''
+        return RollingState.from_arr(self.data_arr, mywindow, ewm_alpha)
     
+    @memoized()
     def corr_pvals(self):
-        '''Calculates pearson's r-squared and p-values comparing each player to each other'''
-        df = pd.DataFrame(self.data_arr, columns=self.data_dict.keys())
-
-        df_rsq = pd.DataFrame() # Correlation matrix
-        df_p = pd.DataFrame()  # Matrix of p-values
-
-        for idx1,col1 in enumerate(df):
-            for idx2,col2 in enumerate(df):
-                temp = df[[col1, col2]].dropna()
-                corr = pearsonr(temp[col1], temp[col2])
-                df_rsq.loc[idx1,idx2] = np.power(corr[0],2)
-                df_p.loc[idx1,idx2] = corr[1]
-        
+        '''
+        Calculates pearson's r-squared and p-values comparing each player to each other,
+        using the puzzles both players attempted
+
+        Returns:
+        df_rsq (dataframe): correlation (r-squared) matrix, rows and columns are player indices
+        df_p (dataframe): matrix of two-sided p-values
+        '''
+        import pandas as pd
+        r, p = pairwise_pearson(self.data_arr)
+        df_rsq = pd.DataFrame(np.power(r,2)) # Correlation matrix
+        df_p = pd.DataFrame(p)  # Matrix of p-values
+
         return df_rsq, df_p
     
+    @memoized()
     def as_df(self):
         '''Returns the score of the puzzles as a dataframe with a puzzle number column'''
-        df = pd.DataFrame(self.data_arr, columns=self.data_dict.keys())
+        import pandas as pd
+        df = pd.DataFrame(self.data_arr, index=pd.RangeIndex(self.FIRST_PUZZ_NUM, self.MAX_PUZZ_NUM), columns=self.players)
         df['Puzzle Number'] = df.index
         return df
     
 
+    @memoized()
     def linear_reg(self):
         '''Returns the data as a dataframe, but each score is replaced by the regression prediction'''
-        df = self.as_df()
-        df_predicted = pd.DataFrame(np.nan, index=df.index, columns=df.columns.drop('Puzzle Number'))
-
-        for sender in df_predicted:
-
-            # Save a dataframe without nan's
-            df_no_na = df[[sender, 'Puzzle Number']].dropna()
-
-            # Create and fit linear regression
-            regressor = LinearRegression()
-            y = df_no_na[[sender]]
-            X = df_no_na[['Puzzle Number']]
-            regressor.fit(X.values, y)
-
-            # Use the regression to predict scores for all puzzles from this sender
-            puzzle_range = np.arange(X.min().min(),X.max().max())
-            temp = pd.DataFrame(regressor.predict(puzzle_range.reshape(-1,1)), columns=['Scores'], index=puzzle_range)
-            df_predicted.loc[puzzle_range,sender] = temp['Scores']
-        
+        import pandas as pd
+        fit = linear_fit(self.data_arr, self.FIRST_PUZZ_NUM)
+
+        # Use the regression to predict scores for all puzzles from each sender,
+        # from their first puzzle up to (not including) their last
+        puzzles = self.puzzle_numbers()[:,None]
+        attempted = self.attempted()
+        first = np.where(attempted.any(axis=0), self.FIRST_PUZZ_NUM + attempted.argmax(axis=0), self.MAX_PUZZ_NUM)
+        last = self.MAX_PUZZ_NUM - 1 - attempted[::-1].argmax(axis=0)
+        in_range = (puzzles >= first) & (puzzles < last)
+        predicted = np.where(in_range, fit['Intercept'] + fit['Slope'] * puzzles, np.nan)
+
+        df_predicted = pd.DataFrame(predicted, index=pd.RangeIndex(self.FIRST_PUZZ_NUM, self.MAX_PUZZ_NUM), columns=self.players)
         return df_predicted
-    
-    def stats(self):
-        '''Calculates various general statistics (mean scores, std dev, etc) for each player'''
-        # Create dataframe and empty df for storing values
-        df = self.as_df().drop('Puzzle Number',axis=1)
-        results = pd.DataFrame({'Person':df.columns,
-                                'Mean solve score': np.nan,
-                                'Solve score standard deviation': np.nan,
-                                'Best solve score': np.nan,
-                                'Puzzles attempted': np.nan,
-                                'Puzzles not attempted': np.nan,
-                                'Longest not attempted puzzle streak': np.nan,
-                                'Longest attempted puzzle streak': np.nan,
-                                'Mean days between puzzles': np.nan
-                                })
-        
-
-
-        for person in df:
-            # Drop nan or guesses
-            df_dropna = df[person].dropna().index.to_numpy()
-            df_dropguess = df[person].drop(df_dropna).index.to_numpy()
-            
-            # Person's row in results for storing results
-            row = results['Person'] == person
-
-            # Calculate number of puzzles not attempted within the period of time
-            # that the person was submitting guesses
-            results.loc[row,'Puzzles not attempted'] = df.loc[df_dropna.min():df_dropna.max(),person].isna().sum()
-
-            # Calculate num of puzzles attempted
-            results.loc[row, 'Puzzles attempted'] = df_dropna.size
 
-            # Calculate longest not attempted streak
-            diff_indices_dropna = df_dropna[1:] - df_dropna[:-1]
-            results.loc[row, 'Longest not attempted puzzle streak'] = diff_indices_dropna.max()
+    @memoized()
+    def trend(self):
+        '''
+        Fits a linear regression of solve score on puzzle number for every player
 
-            # Calculate longest attempted streak
-            diff_indices_dropguess = df_dropguess[1:] - df_dropguess[:-1]
-            results.loc[row, 'Longest attempted puzzle streak'] = diff_indices_dropguess.max()
+        Returns:
+        dataframe with one row per player and columns Slope (change in solve score per puzzle),
+        Intercept, Slope standard error, Intercept standard error, P-value (two-sided t-test
+        of slope = 0) and Puzzles attempted
+        '''
+        import pandas as pd
+        return pd.DataFrame(linear_fit(self.data_arr, self.FIRST_PUZZ_NUM), index=pd.Index(self.players, name='Person'))
 
-            # Calculate best score
-            results.loc[row, 'Best solve score'] = df[person].min()
+    @memoized(maxsize=16)
+    def rolling_trend(self, mywindow):
+        '''
+        Fits a linear regression of solve score on puzzle number over a sliding window of puzzles,
+        to see whether improvement is speeding up or slowing down
 
-            # Calculate solve score std dev
-            results.loc[row, 'Solve score standard deviation'] = df[person].std()
+        Parameters:
+        mywindow (int): the window size, in puzzle numbers
 
-            # Calculate mean solve score
-            results.loc[row, 'Mean solve score'] = df[person].mean()
+        Returns:
+        df_slope (dataframe): the slope of the regression over the mywindow puzzles ending at each
+                              puzzle (row), for each player (column). nan where fewer than 3 puzzles
+                              in the window were attempted
+        df_p (dataframe): the p-value of each slope
+        '''
+        import pandas as pd
+        fit = rolling_linear_fit(self.data_arr, mywindow)
+        index = pd.RangeIndex(self.FIRST_PUZZ_NUM, self.MAX_PUZZ_NUM)
+        df_slope = pd.DataFrame(fit['Slope'], index=index, columns=self.players)
+        df_p = pd.DataFrame(fit['P-value'], index=index, columns=self.players)
+        return df_slope, df_p
+    
+    @memoized(copy=False)
+    def streaks(self):
+        '''Returns the Streaks (runs of attempted and not attempted puzzles) of every player'''
+        return Streaks(self.attempted(), self.players, self.FIRST_PUZZ_NUM)
 
-            # Calculate mean days between puzzles
-            results.loc[row, 'Mean days between puzzles'] = diff_indices_dropna.mean()
+    @memoized()
+    def stats(self):
+        '''Calculates various general statistics (mean scores, std dev, etc) for each player'''
+        import pandas as pd
+        attempted = self.attempted()
+        num_attempted = attempted.sum(axis=0)
+        streaks = self.streaks()
+
+        # First and last puzzle attempted by each person
+        first = attempted.argmax(axis=0)
+        last = len(attempted) - 1 - attempted[::-1].argmax(axis=0)
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            results = pd.DataFrame({'Person':self.players,
+                                    'Mean solve score': np.nanmean(self.data_arr, axis=0),
+                                    'Solve score standard deviation': np.nanstd(self.data_arr, axis=0, ddof=1),
+                                    'Best solve score': np.nanmin(self.data_arr, axis=0),
+                                    'Puzzles attempted': num_attempted,
+
+                                    # Puzzles not attempted within the period of time
+                                    # that the person was submitting guesses
+                                    'Puzzles not attempted': last - first + 1 - num_attempted,
+                                    'Longest not attempted puzzle streak': streaks.longest(attempted=False, interior=True),
+                                    'Longest attempted puzzle streak': streaks.longest(attempted=True),
+                                    'Mean days between puzzles': (last - first) / (num_attempted - 1)
+                                    })
 
         # Set dataframe properties
         results.set_index('Person', inplace=True)
-        results['Best solve score'] = results['Best solve score'].map(int)
-        results['Longest not attempted puzzle streak'] = results['Longest not attempted puzzle streak'].map(int)
-        results['Longest attempted puzzle streak'] = results['Longest attempted puzzle streak'].map(int)
-        results['Puzzles not attempted'] = results['Puzzles not attempted'].map(int)
-        results['Puzzles attempted'] = results['Puzzles attempted'].astype(int)
+        for col in ['Best solve score', 'Longest not attempted puzzle streak', 'Longest attempted puzzle streak',
+                    'Puzzles not attempted', 'Puzzles attempted']:
+            if results[col].notna().all():
+                results[col] = results[col].astype(int)
 
         return results
     
-    def puzz_avg(self):
+    @memoized(maxsize=8, copy=False)
+    def cell_counts(self, puzzle_range=None, weekday=None):
         '''
-        Calculates the mean int value for each position in the 5x6 puzzle grid
-        across all puzzles and all players
+        Counts each value (0-3) of each grid cell for each player (see grid_cell_counts),
+        shared by puzz_avg and cell_probabilities
+
+        Parameters:
+        puzzle_range (tuple): (optional) only count puzzles first <= puzzle number < last
+        weekday (int or string): (optional) only count puzzles of this weekday (0 = Monday or 'Monday')
+
+        Returns:
+        P x 6 x 5 x 4 int64 ndarray of counts
         '''
-        # Get data in dict format, and the puzzle solve score as well
-        data = self.data_dict
-        score = self.data_arr
+        if isinstance(weekday, str):
+            weekday = WEEKDAYS.index(weekday)
+        return grid_cell_counts(self.store, self.NUM_SENDERS, puzzle_range, weekday)
 
+    @memoized(maxsize=8)
+    def puzz_avg(self, puzzle_range=None, weekday=None):
+        '''
+        Calculates the mean int value for each position in the 5x6 puzzle grid
+        across all puzzles and all players
 
+        Parameters:
+        puzzle_range (tuple): (optional) only include puzzles first <= puzzle number < last
+        weekday (int or string): (optional) only include puzzles of this weekday (0 = Monday or 'Monday')
 
-        # Create empty dict to hold results and array to hold avg for each person
-        results = {}
-        accum = np.empty([6,5,data.keys().__len__()])
-        
-        # Find average across all puzzles for each person
-        for i, person in enumerate(data):
-            # Reduce all puzzle guesses to only puzzles attempted
-            indeces_attempted = ~np.isnan(score[:,i])
-            person_all_puzzles = data[person]
-            person_attempted_puzzles = person_all_puzzles[:,:,indeces_attempted]
+        Returns:
+        dict of a 6x5 array of means for each player and 'Average' (the mean of the players'
+        means), 0 where there were no guesses
+        '''
+        counts = self.cell_counts(puzzle_range, weekday)
 
-            # Replace 0s (which means no guess) with nan so it's not included in the mean
-            indeces_letter_guessed = person_attempted_puzzles > 0
-            person_attempted_puzzles_nan = np.where(person_attempted_puzzles == 0, np.nan, person_attempted_puzzles)
+        # Sum each grid position and count the guesses (non 0s) per person,
+        # so 0s (which means no guess) are not included in the mean
+        sums = counts @ np.arange(4)
+        guesses = counts[:,:,:,1:].sum(axis=3)
 
-            # Find average for puzzles attempted
-            person_avg= np.nanmean(person_attempted_puzzles_nan,axis=2)
+        # Find average for puzzles attempted, nan where nobody guessed
+        with np.errstate(invalid='ignore', divide='ignore'):
+            accum = sums / guesses
 
-            # Save results (with nan) in accum
-            accum[:,:,i] = person_avg
+        results = {person: np.nan_to_num(accum[i]) for i, person in enumerate(self.players)}
 
-            # Change nan to 0s for final results returned and save
-            results[person] = np.nan_to_num(person_avg,copy=False)
+        # Find average across all puzzles for all persons
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning)
+            results['Average'] = np.nan_to_num(np.nanmean(accum, axis=0) if len(accum) else np.full([6,5], np.nan))
 
+        return results
 
+    @memoized(maxsize=8)
+    def cell_probabilities(self, puzzle_range=None, weekday=None):
+        '''
+        Calculates how often each position in the 5x6 puzzle grid is grey, yellow and green,
+        from the same counts as puzz_avg
 
-        # Find average across all puzzles for all persons
-        results['Average'] = np.nanmean(accum,axis=2)
-        results['Average'] = np.nan_to_num(results['Average'],copy=False)
-        
+        Parameters:
+        puzzle_range (tuple): (optional) only include puzzles first <= puzzle number < last
+        weekday (int or string): (optional) only include puzzles of this weekday (0 = Monday or 'Monday')
 
+        Returns:
+        dict of a 6x5x3 array of the probabilities of grey, yellow and green for each player and
+        'Average' (the mean of the players' probabilities), 0 where there were no guesses
+        '''
+        counts = self.cell_counts(puzzle_range, weekday)[:,:,:,1:]
+        guesses = counts.sum(axis=3, keepdims=True)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            probabilities = counts / guesses
+
+        results = {person: np.nan_to_num(probabilities[i]) for i, person in enumerate(self.players)}
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning)
+            results['Average'] = np.nan_to_num(np.nanmean(probabilities, axis=0) if len(probabilities)
+                                               else np.full([6,5,3], np.nan))
         return results
     
-    def letter_patterns(self):
+    @memoized(copy=False)
+    def pattern_index(self):
+        '''Returns the PatternIndex of all puzzles (built on first use)'''
+        return PatternIndex(self.store)
+
+    @memoized(maxsize=32)
+    def letter_patterns(self, player=None, puzzle_range=None):
         '''
         Calculates the most frequent patterns of guess results for each of the 6 rows.
 
+        Parameters:
+        player (int or string): (optional) only count this player's puzzles
+        puzzle_range (tuple): (optional) only count puzzles first <= puzzle number < last
+
         Returns:
         results: the patterns of the most frequent results per row
         results_freq: the frequency (percentage) of each result, excluding the all 0s result
@@ -399,41 +1180,182 @@ class WordleData:
         # Create results variable to hold output of function, which will be a 6x5 array
         # for each of the 6 guess rows of the puzzle, containing the top most commonly
         # guessed patterns for that row
-        results = np.empty([6,5,6])
-        results_freq = np.empty([6,1,6])
+        results = np.zeros([6,5,6])
+        results_freq = np.zeros([6,1,6])
 
-        # Get data in dict format
-        data = self.data_dict
+        # For each guess row, find the top 6 patterns from the pattern code counts
+        index = self.pattern_index()
+        for i in range(6):
+            patterns, freq = index.top(i, 6, player, puzzle_range)
+            results[:len(patterns),:,i] = patterns
+            results_freq[:len(freq),0,i] = freq
 
-        # Change to numpy array and concatenate all puzzle guesses
-        arr = np.empty([6,5,self.MAX_PUZZ_NUM*self.NUM_SENDERS])
+        return results, results_freq
 
-        for i,sender in enumerate(data):
-            arr_range = range(self.MAX_PUZZ_NUM * i, self.MAX_PUZZ_NUM * (i+1))
-            arr[:,:,arr_range] = data[sender]
 
-        # For each guess row, count unique patterns
-        for i in range(6):
+class WordleDataView(WordleData):
+    '''
+    The puzzles of a WordleData object within a range of puzzle numbers (see WordleData.between).
+
+    data_arr is a slice (not a copy) of the full data's, and the store of the puzzles in the
+    range is only made when a method needs it, from a binary search of the full data's
+    PuzzleIndex. Analysis results are numbered by puzzle as for the full data. A view doesn't
+    follow later changes to the full data (call between() again) and can't be appended to.
+
+    Attributes:
+    root (WordleData): the full data
+    '''
+    def __init__(self, data, first, last):
+        self.root = getattr(data, 'root', data)
+        self._cache = {}
+        self.version = 0
+        self.metrics = data.metrics
+        self.FIRST_PUZZ_NUM = first
+        self.MAX_PUZZ_NUM = last
+        self.NUM_SENDERS = data.NUM_SENDERS
+        self._store = None
+
+        # Rows of the full data_arr are puzzle numbers from root.FIRST_PUZZ_NUM
+        offset = self.root.FIRST_PUZZ_NUM
+        self._data_arr = self.root.data_arr[first - offset:last - offset]
+
+    @property
+    def players(self):
+        '''List of player names, in column order of self.data_arr'''
+        return self.root.players
+
+    @property
+    def store(self):
+        '''PuzzleStore of the puzzles in the view (made on first use)'''
+        if self._store is None:
+            rows = self.root.puzzle_index().rows_between(self.FIRST_PUZZ_NUM, self.MAX_PUZZ_NUM)
+            self._store = self.root.store.select(np.sort(rows))
+        return self._store
+
+    def append(self, player, puzzle, grid):
+        raise TypeError('A WordleDataView can\'t be changed, append to the full data and call between() again')
+
+
+class PuzzleIndex:
+    '''
+    Index of the puzzles in a PuzzleStore by player and puzzle number (and so by date, see
+    puzzle_dates): the puzzles sorted by player then puzzle number, so a player's puzzles or
+    a player's puzzle range is one slice, and in puzzle number order, so the puzzles of all
+    players in a range are found with binary searches.
+
+    Attributes:
+    by_player (ndarray): store rows sorted by player and puzzle number
+    player_id (ndarray): player of each puzzle, in by_player order
+    puzzle_num (ndarray): puzzle number of each puzzle, in by_player order
+    player_start (ndarray): index in by_player of each player's first puzzle, and the number of puzzles at the end
+    by_puzzle (ndarray): indices into by_player order, sorted by puzzle number
+    sorted_puzzle_num (ndarray): puzzle numbers in by_puzzle order
+    players (list): player names
+    '''
+    def __init__(self, store):
+        # Sort by player then puzzle, so a player or a player's puzzle range is one slice
+        self.by_player = np.lexsort((store.puzzle_num, store.player_id))
+        self.players = store.players
+        self.player_id = store.player_id[self.by_player]
+        self.puzzle_num = store.puzzle_num[self.by_player]
+        self.player_start = np.searchsorted(self.player_id, np.arange(len(self.players)+1))
+
+        # Order of all puzzles by puzzle number, for puzzle ranges across all players
+        self.by_puzzle = np.argsort(self.puzzle_num, kind='stable')
+        self.sorted_puzzle_num = self.puzzle_num[self.by_puzzle]
+
+    def rows(self, player=None, puzzle_range=None):
+        '''
+        Selects puzzles with binary searches
+
+        Parameters:
+        player (int or string): (optional) only this player's puzzles
+        puzzle_range (tuple): (optional) only puzzles first <= puzzle number < last
 
-            # Find unique patterns and their frequencies
-            unique, unique_counts = np.unique(arr[i,:,:], axis=1, return_counts=True)
+        Returns:
+        slice or index array into by_player order (e.g. the columns of PatternIndex.codes)
+        '''
+        if player is not None:
+            if not isinstance(player, (int, np.integer)):
+                player = self.players.index(player)
+            start, stop = self.player_start[player], self.player_start[player+1]
+            if puzzle_range is not None:
+                start, stop = start + np.searchsorted(self.puzzle_num[start:stop], puzzle_range)
+            return slice(start, stop)
 
-            # Remove the unique row where there are no guesses (6 0s in a row)
-            idx_no_guesses = np.where(sum(unique) == 0)[0]
-            unique = np.delete(unique,idx_no_guesses, axis=1)
-            unique_counts = np.delete(unique_counts,idx_no_guesses)
-            
-            # Sort unique by frequency of unique_counts
-            sorted_count_ind = np.argsort(-unique_counts)
+        if puzzle_range is not None:
+            start, stop = np.searchsorted(self.sorted_puzzle_num, puzzle_range)
+            return self.by_puzzle[start:stop]
 
-            # Save the top 6 patterns
-            results[:,:,i] = unique[:,sorted_count_ind[0:6]].T
+        return slice(None)
+
+    def rows_between(self, first, last, player=None):
+        '''Returns the store rows of the puzzles first <= puzzle number < last (of one player, if given)'''
+        return self.by_player[self.rows(player, (first, last))]
+
+
+class PatternIndex(PuzzleIndex):
+    '''
+    An index of the guess result pattern of each row of each puzzle, for fast pattern counts.
+
+    Each row of 5 results (ints 0-3) is stored as a 5 digit base-4 pattern code (0-1023),
+    first letter most significant, so the codes sort in the same order as the patterns.
+    Counting patterns is then a np.bincount over at most 1024 codes. Puzzles are selected
+    as in PuzzleIndex.
+
+    Attributes:
+    codes (ndarray): 6 x number of puzzles uint16 pattern codes, sorted by player and puzzle number
+    total_counts (ndarray): 6 x 1024 counts of every pattern code in every row
+    '''
+    def __init__(self, store):
+        super().__init__(store)
+        self.codes = pattern_codes(store.grid[self.by_player])
+
+        # Counts of every pattern in every row
+        self.total_counts = np.stack([np.bincount(row, minlength=1024) for row in self.codes])
+
+    def counts(self, row, player=None, puzzle_range=None):
+        '''
+        Counts each pattern code in one guess row (0-5)
+
+        Returns:
+        ndarray of 1024 counts, indexed by pattern code
+        '''
+        if player is None and puzzle_range is None:
+            return self.total_counts[row]
+        return np.bincount(self.codes[row, self.rows(player, puzzle_range)], minlength=1024)
+
+    def top(self, row, k=6, player=None, puzzle_range=None):
+        '''
+        Finds the most frequent patterns in one guess row, excluding the all 0s (no guess) pattern
+
+        Parameters:
+        row (int): guess row 0-5
+        k (int): number of patterns
+        player, puzzle_range: (optional) see rows()
+
+        Returns:
+        patterns: k x 5 ndarray of the top patterns (fewer if there are fewer patterns)
+        freq: frequency of each pattern as a fraction of all guesses in this row
+        '''
+        counts = self.counts(row, player, puzzle_range)
+
+        # Patterns that occur, in code (= pattern) order, without the no guess pattern 0
+        codes = np.flatnonzero(counts[1:]) + 1
+        code_counts = counts[codes]
+
+        # Sort by frequency
+        sorted_count_ind = np.argsort(-code_counts)[0:k]
+        with np.errstate(invalid='ignore'):
+            freq = code_counts[sorted_count_ind] / np.sum(code_counts)
+        return decode_pattern_codes(codes[sorted_count_ind]), freq
+
+
+def format_freq(currfreq):
+    '''Formats a frequency as a percentage the way int_to_char prints it, e.g. 0.125 -> '%12.50' '''
+    return '%' + '{:.2f}'.format(currfreq*100)
 
-            # Save the frequency of each pattern
-            results_freq[:,0,i] = unique_counts[sorted_count_ind[0:6]] / np.sum(unique_counts)
 
-        return results, results_freq
-    
 def int_to_char(input,freq=None):
     '''
     Converts unicode character codes to characters
@@ -444,53 +1366,1012 @@ def int_to_char(input,freq=None):
             format and output frequencies as percentages
 
     Returns:
-    ndarray of characters where
+    string of characters, 5 per line, where
     0 = space filler for unused guesses = 9744
     1 = gray box (wrong letter, not in word) = 11036
     2 = yellow box (wrong letter, but is in word) = 129000
     3 = green box (right letter) = 129001
+    and each line starts with its frequency (e.g. '%12.50') if freq is given
 
     '''
+    # Look up the character code of every int, with a newline after every 5
+    codes = GRID_CODE_POINTS[np.asarray(input, dtype=np.int64).ravel()]
+    codes = np.insert(codes, np.arange(5, len(codes), 5), ord('\n'))
+    text = codes.astype('<u4').tobytes().decode('utf-32-le')
 
-    # Cast input as int and flatten
-    int_arr = np.int32(input.flatten())
+    # Start each line with its frequency as a percentage
+    if freq is not None:
+        lines = text.split('\n')
+        for count, currfreq in enumerate(np.asarray(freq).reshape(len(freq), -1)[:len(lines),0]):
+            lines[count] = format_freq(currfreq) + lines[count]
+        text = '\n'.join(lines)
 
-    # Replace ints with unicode char codes
-    int_arr[int_arr==0] = 9744
-    int_arr[int_arr==1] = 11036
-    int_arr[int_arr==2] = 129000
-    int_arr[int_arr==3] = 129001
+    return text
 
-    # Create char array using unicode char codes
+def render_grids(grids, freq=None):
     '''
-    my_str = np.array2string(int_arr,
-                           max_line_width=7,
-                           formatter={'int':lambda x: chr(x)},
-                           separator='')
-    my_str = my_str.replace("[","").replace("]","").replace(" ","")   #get rid of brackets and spaces
+    Renders a stack of grids as strings of boxes, all at once
+
+    Parameters:
+    grids: rows x 5 x N int ndarray of grids (e.g. 6x5xN puzzles, or 1x5xN guess patterns),
+           a single rows x 5 grid, or a uint64 ndarray of N packed grids (see pack_grids)
+    freq: (optional) N frequencies, each grid is preceded by a line with its frequency as a
+          percentage (e.g. '%12.50', see format_freq)
+
+    Returns:
+    list of N strings, with one line of 5 boxes per row of the grid (0s are shown as empty boxes)
     '''
-    
-    # Create char array using unicode char codes
-    chr_ar = [chr(code) for code in int_arr]
-
-    # Insert newline characters at every 6th position
-    for count,listpos in enumerate(range(0,len(chr_ar),5)):
-        if listpos==0:
-            continue
-        if listpos>0 and listpos % 5 == 0:
-            chr_ar.insert(listpos+count-1,'\n')
-    
-    # Insert frequencies after '\n' if a freq var is passed 0 7 14
+    grids = np.asarray(grids)
+    if grids.dtype == np.uint64:
+        grids = unpack_grids(grids)
+    elif grids.ndim == 2:
+        grids = grids[:,:,None]
+    num_rows, num_cols, num_grids = grids.shape
+
+    # Character codes of every grid, one line per row, in one array
+    codes = np.full([num_grids, num_rows, num_cols+1], ord('\n'), dtype='<u4')
+    codes[:,:,:num_cols] = GRID_CODE_POINTS[grids.transpose(2,0,1).astype(np.int64)]
+    text = codes.tobytes().decode('utf-32-le')
+
+    # Split the text into grids, leaving out each grid's last newline
+    width = num_rows * (num_cols+1)
+    rendered = [text[start:start+width-1] for start in range(0, len(text), width)]
+
     if freq is not None:
-        for count,currfreq in enumerate(freq):
-            insertion = '%'+ "{:.2f}".format((currfreq[0]*100))
-            if count == 0:
-                chr_ar.insert(0,insertion)
-            if count > 0:
-                idx = chr_ar.index('\n',(count-1)*7) + 1
-                chr_ar.insert(idx,insertion)
-    
-    # Join chars together
-    #print("".join(chr_ar))
-    return "".join(chr_ar)
-        
\ No newline at end of file
+        rendered = [f'{format_freq(currfreq)}\n{grid}' for currfreq, grid in zip(np.ravel(freq), rendered)]
+    return rendered
+
+def grids_table(grids, freq=None, labels=None, table_format='markdown'):
+    '''
+    Renders a stack of grids (see render_grids) as a table with one row per grid
+
+    Parameters:
+    grids: grids as accepted by render_grids
+    freq: (optional) N frequencies, shown as percentages in a Frequency column
+    labels: (optional) N labels (e.g. player names or puzzle numbers), shown in the first column
+    table_format (string): 'markdown' or 'html'
+
+    Returns:
+    the table as a string, with <br> line breaks between the rows of each grid. Cells are
+    escaped for the table format (| for markdown, html special characters for html).
+    '''
+    if table_format not in ('markdown', 'html'):
+        raise ValueError(f'Unknown table format {table_format!r}')
+
+    if table_format == 'html':
+        escape = html.escape
+    else:
+        # A | would end the markdown cell
+        def escape(cell):
+            return cell.replace('|', '\\|')
+    cells = [[escape(grid).replace('\n', '<br>')] for grid in render_grids(grids)]
+    header = ['Grid']
+    if labels is not None:
+        header.insert(0, '')
+        cells = [[escape(str(label))] + row for label, row in zip(labels, cells)]
+    if freq is not None:
+        header.append('Frequency')
+        cells = [row + [format_freq(currfreq)] for row, currfreq in zip(cells, np.ravel(freq))]
+
+    if table_format == 'markdown':
+        lines = ['| ' + ' | '.join(header) + ' |', '|' + ' :---: |' * len(header)]
+        lines += ['| ' + ' | '.join(row) + ' |' for row in cells]
+    else:
+        lines = ['<table>', '<tr>' + ''.join(f'<th>{escape(cell)}</th>' for cell in header) + '</tr>']
+        lines += ['<tr>' + ''.join(f'<td>{cell}</td>' for cell in row) + '</tr>' for row in cells]
+        lines.append('</table>')
+    return '\n'.join(lines)
+        
+def convert_pickle(pickle_dir, store_dir):
+    '''
+    Converts a pickle file made by an older version of "Convert emails to ints.py"
+    (a dict of dense per-sender arrays, or of PuzzleStore columns) to a store file
+
+    Parameters:
+    pickle_dir (string): path of the .pkl file
+    store_dir (string): path of the store file to write
+
+    Returns:
+    store (PuzzleStore): the converted data
+    '''
+    with open(pickle_dir, 'rb') as file:
+        full_data = pickle.load(file)
+
+    if STORE_COLUMNS.issubset(full_data):
+        store = PuzzleStore(**full_data)
+    else:
+        store = PuzzleStore.from_cubes({sender: full_data[sender]['0'] for sender in full_data})
+
+    store.save(store_dir)
+    return store
+
+def pack_grids(grids):
+    '''
+    Packs 6x5 grids of ints 0-3 into one uint64 each, 2 bits per cell
+
+    Parameters:
+    grids: 6x5xN int ndarray
+
+    Returns:
+    uint64 ndarray of length N, where cell [row, col] is stored in bits 2*(5*row+col) and up
+    '''
+    cells = np.reshape(grids, (30,-1)).astype(np.uint64)
+    return np.bitwise_or.reduce(cells << GRID_SHIFTS[:,None], axis=0)
+
+def unpack_grids(packed):
+    '''
+    Unpacks uint64 grids made by pack_grids
+
+    Parameters:
+    packed: uint64 ndarray of length N
+
+    Returns:
+    6x5xN uint8 ndarray of grids
+    '''
+    packed = np.asarray(packed, dtype=np.uint64)
+    cells = (packed[None,:] >> GRID_SHIFTS[:,None]) & np.uint64(3)
+    return cells.astype('uint8').reshape(6,5,-1)
+
+def grid_cell_counts(store, num_players, puzzle_range=None, weekday=None, chunk_size=CELL_COUNT_CHUNK_SIZE):
+    '''
+    Counts how often each grid cell has each value (0 = no guess, 1 = grey, 2 = yellow,
+    3 = green) for each player, with integer accumulators. The packed grids are unpacked
+    chunk_size puzzles at a time, so memory use doesn't grow with the number of puzzles.
+
+    Parameters:
+    store (PuzzleStore): the puzzles
+    num_players (int): number of players
+    puzzle_range (tuple): (optional) only count puzzles first <= puzzle number < last
+    weekday (int): (optional) only count puzzles of this weekday (0 = Monday ... 6 = Sunday)
+
+    Returns:
+    num_players x 6 x 5 x 4 int64 ndarray of counts
+    '''
+    counts = np.zeros(num_players*30*4, dtype=np.int64)
+    cell_offsets = (np.arange(30)*4)[:,None]
+    for start in range(0, len(store), chunk_size):
+        rows = slice(start, start + chunk_size)
+        puzzle_num = store.puzzle_num[rows]
+        player_id = store.player_id[rows]
+        grid = store.grid[rows]
+
+        # Leave out puzzles outside the range or of other weekdays
+        if puzzle_range is not None or weekday is not None:
+            keep = np.ones(len(puzzle_num), dtype=bool)
+            if puzzle_range is not None:
+                keep &= (puzzle_num >= puzzle_range[0]) & (puzzle_num < puzzle_range[1])
+            if weekday is not None:
+                keep &= calendar_buckets(puzzle_num, 'weekday')[0] == weekday
+            player_id, grid = player_id[keep], grid[keep]
+
+        # Index of each (player, cell, value) count, for every cell of every puzzle in the chunk
+        cells = unpack_grids(grid).reshape(30,-1)
+        index = player_id.astype(np.int64)*120 + cell_offsets + cells
+        counts += np.bincount(index.ravel(), minlength=len(counts))
+
+    return counts.reshape(num_players,6,5,4)
+
+def solve_scores(packed):
+    '''
+    Calculates the solve score of packed grids: the 1-based row of the first all green row,
+    or 7 if the puzzle was attempted but not solved
+
+    Parameters:
+    packed: uint64 ndarray of grids made by pack_grids
+
+    Returns:
+    float ndarray of solve scores, nan for empty (not attempted) grids
+    '''
+    packed = np.asarray(packed, dtype=np.uint64)
+    rows = (packed[None,:] >> ROW_SHIFTS[:,None]) & np.uint64(SOLVED_ROW)
+    solved = rows == SOLVED_ROW
+    scores = np.where(solved.any(axis=0), solved.argmax(axis=0) + 1, 7).astype(float)
+    scores[packed == 0] = np.nan
+    return scores
+
+def pairwise_pearson(arr):
+    '''
+    Calculates pearson's r and its p-value for every pair of columns of arr, each pair using
+    only the rows where both columns are not nan (like scipy.stats.pearsonr on the pair
+    with the nan rows dropped). The sums needed for all pairs are found with matrix products.
+
+    Parameters:
+    arr: number of rows x P ndarray with nan for missing values
+
+    Returns:
+    r: PxP ndarray of correlation coefficients (nan if a pair has fewer than 2 rows in common
+       or one of them is constant over those rows)
+    p: PxP ndarray of two-sided p-values (1 when a pair has exactly 2 rows in common)
+    '''
+    from scipy.stats import t as student_t
+    present = (~np.isnan(arr)).astype(float)
+    values = np.where(present > 0, arr, 0)
+
+    # Number of rows in common, and sums over the rows in common for each pair (i, j)
+    n = present.T @ present
+    sum_x = values.T @ present          # sum of column i where j is present
+    sum_xx = (values**2).T @ present
+    sum_xy = values.T @ values
+
+    # Pearson's r from the centered sums
+    with np.errstate(invalid='ignore', divide='ignore'):
+        cov = sum_xy - sum_x * sum_x.T / n
+        var_x = sum_xx - sum_x**2 / n
+        r = cov / np.sqrt(var_x * var_x.T)
+        r = np.clip(r, -1, 1)
+        r[n < 2] = np.nan
+
+        # Two-sided p-value from the t-distribution with n-2 degrees of freedom
+        dof = n - 2
+        t = r * np.sqrt(dof / ((1 - r) * (1 + r)))
+        p = 2 * student_t.sf(np.abs(t), dof)
+    p[np.abs(r) == 1] = 0
+    p[n == 2] = 1
+    p[np.isnan(r)] = np.nan
+
+    return r, p
+
+def puzzle_dates(puzzle_nums):
+    '''Converts Wordle puzzle numbers to numpy datetime64[D] dates'''
+    return PUZZLE_0_DATE + np.asarray(puzzle_nums).astype('timedelta64[D]')
+
+def puzzle_number(value):
+    '''Converts a date ('2023-01-01', datetime.date or numpy datetime64) to its Wordle puzzle number, ints are returned as they are'''
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    return int((np.datetime64(value, 'D') - PUZZLE_0_DATE).astype(np.int64))
+
+def calendar_buckets(puzzle_nums, bucket):
+    '''
+    Groups puzzle numbers by their date
+
+    Parameters:
+    puzzle_nums: ndarray of puzzle numbers
+    bucket (string): 'weekday', 'weekend', 'isoweek', 'month' or 'year' (see WordleData.calendar)
+
+    Returns:
+    bucket_ids: ndarray of the bucket index of each puzzle
+    labels (list): the label of each bucket, in calendar order
+    '''
+    dates = puzzle_dates(puzzle_nums)
+
+    # Monday = 0 ... Sunday = 6 (1970-01-01 was a Thursday)
+    weekday = (dates.astype(np.int64) + 3) % 7
+
+    if bucket == 'weekday':
+        return weekday, WEEKDAYS
+    if bucket == 'weekend':
+        return (weekday >= 5).astype(np.int64), ['Weekday', 'Weekend']
+    if bucket == 'year':
+        values = dates.astype('datetime64[Y]').astype(np.int64) + 1970
+    elif bucket == 'month':
+        values = dates.astype('datetime64[M]')
+    elif bucket == 'isoweek':
+        # The ISO year of a date is the year of the Thursday in the same (Monday-Sunday) week
+        thursday = dates - weekday.astype('timedelta64[D]') + np.timedelta64(3, 'D')
+        iso_year = thursday.astype('datetime64[Y]')
+        iso_week = (thursday - iso_year.astype('datetime64[D]')).astype(np.int64) // 7 + 1
+        values = (iso_year.astype(np.int64) + 1970) * 100 + iso_week
+    else:
+        raise ValueError(f'Unknown calendar bucket {bucket!r}')
+
+    unique_values, bucket_ids = np.unique(values, return_inverse=True)
+    if bucket == 'isoweek':
+        labels = [f'{value // 100}-W{value % 100:02d}' for value in unique_values]
+    else:
+        labels = [str(value) if bucket == 'month' else int(value) for value in unique_values]
+    return bucket_ids, labels
+
+def bucket_stats(arr, bucket_ids, num_buckets, attempted=None, failed=None):
+    '''
+    Calculates the count, mean and standard error of the mean of every column of arr,
+    grouped by bucket, with one np.bincount per statistic for all columns at once.
+    The count includes failed puzzles (7), the mean and SEM exclude them.
+
+    Parameters:
+    arr: number of puzzles x P ndarray of solve scores, nan for puzzles not attempted
+    bucket_ids: ndarray of the bucket of each row of arr
+    num_buckets (int): number of buckets
+    attempted, failed: (optional) boolean arrays the shape of arr, where arr is not nan and
+                       where it is 7, if they have already been calculated
+
+    Returns:
+    count, mean, sem: num_buckets x P ndarrays (mean nan for no scores, sem nan for fewer than 2)
+    '''
+    num_cols = arr.shape[1]
+    size = num_buckets * num_cols
+
+    # Flat index of each (bucket, column) cell
+    cell = (np.asarray(bucket_ids)[:,None] * num_cols + np.arange(num_cols)).ravel()
+    values = arr.ravel()
+    attempted = ~np.isnan(values) if attempted is None else attempted.ravel()
+    scored = attempted & ((values != 7) if failed is None else ~failed.ravel())
+
+    count = np.bincount(cell[attempted], minlength=size)
+    n = np.bincount(cell[scored], minlength=size)
+    total = np.bincount(cell[scored], weights=values[scored], minlength=size)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = total / n
+
+        # Sum of squared deviations from each cell's mean
+        deviations = values[scored] - mean[cell[scored]]
+        ss = np.bincount(cell[scored], weights=deviations**2, minlength=size)
+        sem = np.sqrt(ss / (n - 1)) / np.sqrt(n)
+    sem[n < 2] = np.nan
+
+    shape = (num_buckets, num_cols)
+    return count.reshape(shape), mean.reshape(shape), sem.reshape(shape)
+
+def compact_columns(arr):
+    '''
+    Moves the non nan values of each column of arr to the top, keeping their order
+
+    Returns:
+    compacted: ndarray the same shape as arr, with the nan values at the bottom of each column
+    counts: number of non nan values in each column
+    '''
+    present = ~np.isnan(arr)
+    order = np.argsort(~present, axis=0, kind='stable')
+    return np.take_along_axis(arr, order, axis=0), present.sum(axis=0)
+
+def rolling_stats(arr, window, std=False, ewm_alpha=None, compacted=None):
+    '''
+    Calculates rolling statistics of every column of arr at once, ignoring nan values.
+    Each column is compacted to its non nan values, the statistics over the last window
+    values come from cumulative sums, and each row of the result gets the value at the next
+    non nan row of its column (nan after the last one). Columns with window values or
+    fewer are all nan.
+
+    Parameters:
+    arr: number of rows x P ndarray with nan for missing values
+    window (int): number of values in each window
+    std (bool): also calculate the rolling standard deviation (ddof=1)
+    ewm_alpha (float): (optional) also calculate the exponentially weighted mean (as pandas
+                       ewm(alpha=ewm_alpha).mean(), which doesn't use the window)
+    compacted (tuple): (optional) the result of compact_columns(arr), if already calculated
+
+    Returns:
+    dict of ndarrays the same shape as arr, with keys 'mean' and, if requested, 'std' and 'ewm'
+    '''
+    compacted, counts = compact_columns(arr) if compacted is None else compacted
+    num_rows, num_cols = arr.shape
+    values = np.nan_to_num(compacted)
+
+    # Statistics for the window ending at each compacted value k (row k-1)
+    def window_sums(values):
+        cumsum = np.zeros([num_rows+1, num_cols])
+        np.cumsum(values, axis=0, out=cumsum[1:])
+        sums = np.full([num_rows, num_cols], np.nan)
+        sums[window-1:] = cumsum[window:] - cumsum[:num_rows-window+1]
+        return sums
+
+    results = {}
+    sums = window_sums(values)
+    results['mean'] = sums / window
+    if std:
+        with np.errstate(invalid='ignore', divide='ignore'):
+            var = (window_sums(values**2) - sums**2 / window) / (window - 1)
+        results['std'] = np.sqrt(np.maximum(var, 0))
+    if ewm_alpha is not None:
+        ewm = np.empty([num_rows, num_cols])
+        weighted_sum = np.zeros(num_cols)
+        weight = np.zeros(num_cols)
+        for k in range(num_rows):
+            weighted_sum = values[k] + (1 - ewm_alpha) * weighted_sum
+            weight = 1 + (1 - ewm_alpha) * weight
+            ewm[k] = weighted_sum / weight
+        results['ewm'] = ewm
+
+    # Index of the next non nan value at or after each row, in compacted order
+    present = ~np.isnan(arr)
+    next_value = np.cumsum(present, axis=0) - present
+    after_last = next_value >= counts
+    too_short = counts <= window
+
+    for stat in results:
+        stat_arr = np.take_along_axis(results[stat], np.minimum(next_value, num_rows-1), axis=0)
+        stat_arr[after_last] = np.nan
+        stat_arr[:, too_short] = np.nan
+        results[stat] = stat_arr
+
+    return results
+
+class RollingState:
+    '''
+    Running rolling statistics of each player's last window solve scores, which are updated
+    in O(1) when a new score is appended instead of being recalculated from the whole history.
+
+    Attributes:
+    window (int): the window size
+    buffer (ndarray): P x window ring buffer of each player's last scores
+    count (ndarray): number of scores appended for each player
+    window_sum, window_sumsq (ndarray): sum and sum of squares of the scores in each window
+    '''
+    def __init__(self, num_players, window, ewm_alpha=None):
+        self.window = window
+        self.ewm_alpha = ewm_alpha
+        self.buffer = np.zeros([num_players, window])
+        self.count = np.zeros(num_players, dtype=np.int64)
+        self.window_sum = np.zeros(num_players)
+        self.window_sumsq = np.zeros(num_players)
+        self.ewm_sum = np.zeros(num_players)
+        self.ewm_weight = np.zeros(num_players)
+
+    @classmethod
+    def from_arr(cls, arr, window, ewm_alpha=None):
+        '''Creates the state from a number of puzzles x P array of solve scores (nan = not attempted)'''
+        state = cls(arr.shape[1], window, ewm_alpha)
+        compacted, counts = compact_columns(arr)
+        for player, count in enumerate(counts):
+            for score in compacted[:count, player]:
+                state.append(player, score)
+        return state
+
+    def add_player(self):
+        '''Adds a player with no scores, returns their index'''
+        self.buffer = np.vstack([self.buffer, np.zeros([1, self.window])])
+        for name in ('count', 'window_sum', 'window_sumsq', 'ewm_sum', 'ewm_weight'):
+            setattr(self, name, np.append(getattr(self, name), 0))
+        return len(self.count) - 1
+
+    def append(self, player, score):
+        '''
+        Adds a solve score for player and updates their rolling statistics
+
+        Returns:
+        the player's rolling mean (nan until they have more than window scores, as in rolling_stats)
+        '''
+        pos = self.count[player] % self.window
+        if self.count[player] >= self.window:
+            old = self.buffer[player, pos]
+            self.window_sum[player] -= old
+            self.window_sumsq[player] -= old**2
+        self.buffer[player, pos] = score
+        self.window_sum[player] += score
+        self.window_sumsq[player] += score**2
+        self.count[player] += 1
+
+        if self.ewm_alpha is not None:
+            self.ewm_sum[player] = score + (1 - self.ewm_alpha) * self.ewm_sum[player]
+            self.ewm_weight[player] = 1 + (1 - self.ewm_alpha) * self.ewm_weight[player]
+
+        return self.mean()[player]
+
+    def mean(self):
+        '''Current rolling mean of each player'''
+        return np.where(self.count > self.window, self.window_sum / self.window, np.nan)
+
+    def std(self):
+        '''Current rolling standard deviation of each player'''
+        with np.errstate(invalid='ignore', divide='ignore'):
+            var = (self.window_sumsq - self.window_sum**2 / self.window) / (self.window - 1)
+        return np.where(self.count > self.window, np.sqrt(np.maximum(var, 0)), np.nan)
+
+    def ewm(self):
+        '''Current exponentially weighted mean of each player'''
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return self.ewm_sum / self.ewm_weight
+
+class LiveAggregates:
+    '''
+    Running aggregates of every player's results, which WordleData.append updates in O(1)
+    per result (Welford's algorithm for means and variances) instead of recalculating them
+    from the whole data set.
+
+    Attributes:
+    count, mean, m2 (ndarray): number of puzzles attempted, mean solve score and sum of
+                               squared differences from the mean of each player
+    weekday_count (ndarray): 7 x P puzzles attempted on each weekday (Monday-Sunday)
+    weekday_n, weekday_mean, weekday_m2 (ndarray): 7 x P Welford accumulators of solve scores
+                                                   on each weekday, excluding failed puzzles (7)
+                                                   as in WordleData.calendar
+    pattern_counts (ndarray): 6 x 1024 counts of every pattern code in every guess row (see PatternIndex)
+    last_puzzle (ndarray): each player's highest attempted puzzle number (-1 for none)
+    run_length (ndarray): length of the streak of attempted puzzles ending at last_puzzle
+    '''
+    def __init__(self, num_players):
+        self.count = np.zeros(num_players, dtype=np.int64)
+        self.mean = np.zeros(num_players)
+        self.m2 = np.zeros(num_players)
+        self.weekday_count = np.zeros([7, num_players], dtype=np.int64)
+        self.weekday_n = np.zeros([7, num_players], dtype=np.int64)
+        self.weekday_mean = np.zeros([7, num_players])
+        self.weekday_m2 = np.zeros([7, num_players])
+        self.pattern_counts = np.zeros([6, 1024], dtype=np.int64)
+        self.last_puzzle = np.full(num_players, -1, dtype=np.int64)
+        self.run_length = np.zeros(num_players, dtype=np.int64)
+
+    @classmethod
+    def from_data(cls, arr, store, first_puzzle=0):
+        '''
+        Builds the aggregates from the whole data set at once
+
+        Parameters:
+        arr: number of puzzles x P ndarray of solve scores (WordleData.data_arr)
+        store (PuzzleStore): the grids of the same puzzles
+        first_puzzle (int): puzzle number of the first row of arr
+        '''
+        num_puzzles, num_players = arr.shape
+        live = cls(num_players)
+        attempted = ~np.isnan(arr)
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            live.count = attempted.sum(axis=0)
+            live.mean = np.where(live.count > 0, np.nanmean(arr, axis=0), 0)
+            live.m2 = np.nansum((arr - live.mean)**2, axis=0)
+
+            weekday, _ = calendar_buckets(np.arange(first_puzzle, first_puzzle + num_puzzles), 'weekday')
+            solved = np.where(arr < 7, arr, np.nan)
+            for day in range(7):
+                day_scores = solved[weekday == day]
+                live.weekday_count[day] = attempted[weekday == day].sum(axis=0)
+                live.weekday_n[day] = (~np.isnan(day_scores)).sum(axis=0)
+                live.weekday_mean[day] = np.where(live.weekday_n[day] > 0, np.nanmean(day_scores, axis=0), 0)
+                live.weekday_m2[day] = np.nansum((day_scores - live.weekday_mean[day])**2, axis=0)
+
+        live.pattern_counts = np.stack([np.bincount(row, minlength=1024) for row in pattern_codes(store.grid)])
+
+        # The streak ending at each player's last attempted puzzle
+        if num_puzzles:
+            live.last_puzzle = np.where(live.count > 0, first_puzzle + num_puzzles - 1 - attempted[::-1].argmax(axis=0), -1)
+            streaks = Streaks(attempted, store.players, first_puzzle)
+            ending = streaks.attempted & (streaks.end == live.last_puzzle[streaks.player])
+            live.run_length[streaks.player[ending]] = streaks.length[ending]
+        return live
+
+    def add_player(self):
+        '''Adds a player with no results, returns their index'''
+        for name in ('count', 'mean', 'm2', 'run_length'):
+            setattr(self, name, np.append(getattr(self, name), 0))
+        self.last_puzzle = np.append(self.last_puzzle, -1)
+        for name in ('weekday_count', 'weekday_n', 'weekday_mean', 'weekday_m2'):
+            values = getattr(self, name)
+            setattr(self, name, np.hstack([values, np.zeros([7, 1], dtype=values.dtype)]))
+        return len(self.count) - 1
+
+    def add(self, player, puzzle, score, codes):
+        '''
+        Adds one result of player
+
+        Parameters:
+        player (int): player index
+        puzzle (int): puzzle number
+        score (float): solve score
+        codes (ndarray): the 6 row pattern codes of the grid (see pattern_codes)
+        '''
+        self.count[player] += 1
+        delta = score - self.mean[player]
+        self.mean[player] += delta / self.count[player]
+        self.m2[player] += delta * (score - self.mean[player])
+
+        day = calendar_buckets(np.array([puzzle]), 'weekday')[0][0]
+        self.weekday_count[day, player] += 1
+        if score < 7:
+            self.weekday_n[day, player] += 1
+            delta = score - self.weekday_mean[day, player]
+            self.weekday_mean[day, player] += delta / self.weekday_n[day, player]
+            self.weekday_m2[day, player] += delta * (score - self.weekday_mean[day, player])
+
+        self.pattern_counts[np.arange(6), codes] += 1
+
+    def remove(self, player, puzzle, score, codes):
+        '''Removes one result added with add (when a result is replaced), Welford's update in reverse'''
+        def welford_remove(n, mean, m2):
+            if n == 1:
+                return 0, 0.0, 0.0
+            old_mean = (n * mean - score) / (n - 1)
+            return n - 1, old_mean, m2 - (score - old_mean) * (score - mean)
+
+        self.count[player] -= 1
+        _, self.mean[player], self.m2[player] = welford_remove(self.count[player] + 1, self.mean[player], self.m2[player])
+
+        day = calendar_buckets(np.array([puzzle]), 'weekday')[0][0]
+        self.weekday_count[day, player] -= 1
+        if score < 7:
+            (self.weekday_n[day, player], self.weekday_mean[day, player],
+             self.weekday_m2[day, player]) = welford_remove(self.weekday_n[day, player],
+                                                            self.weekday_mean[day, player],
+                                                            self.weekday_m2[day, player])
+
+        self.pattern_counts[np.arange(6), codes] -= 1
+
+    def extend_streak(self, player, puzzle, scores):
+        '''
+        Updates the streak ending at player's last puzzle for a newly attempted puzzle.
+        O(1) for results arriving in order, a late result only scans the streak it joins.
+
+        Parameters:
+        player (int): player index
+        puzzle (int): the newly attempted puzzle number
+        scores: ndarray of the player's solve scores by puzzle number, including this one (nan = not attempted)
+        '''
+        last = self.last_puzzle[player]
+        if puzzle == last + 1:
+            self.run_length[player] += 1
+            self.last_puzzle[player] = puzzle
+        elif puzzle > last:
+            self.run_length[player] = 1
+            self.last_puzzle[player] = puzzle
+        elif puzzle == last - self.run_length[player]:
+            # Fills the gap before the current streak, joining it to any streak before the gap
+            start = puzzle
+            while start > 0 and not np.isnan(scores[start - 1]):
+                start -= 1
+            self.run_length[player] = last - start + 1
+
+    def average(self):
+        '''Mean of each player's solve scores (nan for players with none, whose running mean is kept at 0)'''
+        return np.where(self.count > 0, self.mean, np.nan)
+
+    def std(self):
+        '''Standard deviation of each player's solve scores (nan for fewer than 2)'''
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(self.count > 1, np.sqrt(self.m2 / (self.count - 1)), np.nan)
+
+    def weekday_std(self):
+        '''7 x P standard deviation of solve scores on each weekday, excluding failed puzzles'''
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(self.weekday_n > 1, np.sqrt(self.weekday_m2 / (self.weekday_n - 1)), np.nan)
+
+    def current_streak(self, latest):
+        '''Length of each player's streak of attempted puzzles ending at puzzle latest (0 if they missed it)'''
+        return np.where(self.last_puzzle == latest, self.run_length, 0)
+
+class Streaks:
+    '''
+    Run-length encoding of each player's attempted / not attempted puzzles: every streak
+    of consecutive attempted or not attempted puzzles, for all players at once.
+
+    Attributes:
+    players (list): player names
+    num_puzzles (int): number of puzzles (rows of the mask)
+    first_puzzle (int): puzzle number of the first row of the mask
+    player (ndarray): player index of each streak
+    attempted (ndarray): True for a streak of attempted puzzles, False for not attempted
+    start, end (ndarray): first and last puzzle number of each streak
+    length (ndarray): number of puzzles in each streak
+    interior (ndarray): True if the streak lies between the player's first and last attempted puzzle
+    '''
+    def __init__(self, mask, players, first_puzzle=0):
+        '''
+        Parameters:
+        mask: number of puzzles x P boolean ndarray, True where the puzzle was attempted
+        players (list): player names
+        first_puzzle (int): puzzle number of the first row of mask
+        '''
+        self.players = players
+        num_puzzles, num_players = mask.shape
+        self.num_puzzles = num_puzzles
+        self.first_puzzle = first_puzzle
+
+        # A streak starts on the first puzzle and wherever the mask changes, per player
+        by_player = mask.T
+        starts_streak = np.ones(by_player.shape, dtype=bool)
+        starts_streak[:,1:] = by_player[:,1:] != by_player[:,:-1]
+        flat_start = np.flatnonzero(starts_streak)
+
+        # Each player's row starts a streak, so the next streak start ends this one
+        flat_end = np.append(flat_start[1:], by_player.size) - 1
+        self.player = flat_start // num_puzzles
+        self.start = flat_start % num_puzzles
+        self.end = flat_end % num_puzzles
+        self.length = self.end - self.start + 1
+        self.attempted = by_player.ravel()[flat_start]
+
+        # Streaks not attempted before a player's first or after their last attempt are not interior
+        touches_edge = (self.start == 0) | (self.end == num_puzzles - 1)
+        self.interior = self.attempted | ~touches_edge
+
+        # Number the puzzles from the first row's puzzle number
+        self.start += first_puzzle
+        self.end += first_puzzle
+
+    def as_df(self):
+        '''Returns every streak as a dataframe with columns Person, Attempted, Start, End and Length'''
+        import pandas as pd
+        return pd.DataFrame({'Person': np.array(self.players, dtype=object)[self.player],
+                             'Attempted': self.attempted,
+                             'Start': self.start,
+                             'End': self.end,
+                             'Length': self.length})
+
+    def select(self, attempted=True, interior=False):
+        '''Boolean mask of the attempted (or not attempted) streaks, optionally only interior ones'''
+        selected = self.attempted == attempted
+        if interior:
+            selected &= self.interior
+        return selected
+
+    def longest(self, attempted=True, interior=False):
+        '''
+        Length of each player's longest streak of attempted (or not attempted) puzzles
+
+        Parameters:
+        attempted (bool): streaks of attempted puzzles, or of puzzles not attempted
+        interior (bool): only count streaks between the player's first and last attempted puzzles
+
+        Returns:
+        ndarray with one value per player, 0 if they have no such streak
+        '''
+        selected = self.select(attempted, interior)
+        longest = np.zeros(len(self.players), dtype=np.int64)
+        np.maximum.at(longest, self.player[selected], self.length[selected])
+        return longest
+
+    def current(self):
+        '''Length of each player's streak of attempted puzzles ending at the last puzzle (0 if they missed it)'''
+        current = np.zeros(len(self.players), dtype=np.int64)
+        ending = self.attempted & (self.end == self.first_puzzle + self.num_puzzles - 1)
+        current[self.player[ending]] = self.length[ending]
+        return current
+
+    def histogram(self, attempted=True, interior=False):
+        '''
+        Counts streaks by length for each player
+
+        Returns:
+        dataframe of the number of streaks of each length (row) for each player (column)
+        '''
+        import pandas as pd
+        selected = self.select(attempted, interior)
+        max_length = self.length[selected].max() if selected.any() else 0
+        cell = self.length[selected] * len(self.players) + self.player[selected]
+        counts = np.bincount(cell, minlength=(max_length+1) * len(self.players))
+        counts = counts.reshape(max_length+1, len(self.players))[1:]
+        return pd.DataFrame(counts, index=pd.RangeIndex(1, max_length+1, name='Streak length'), columns=self.players)
+
+def linear_fit(arr, first_x=0):
+    '''
+    Fits a least squares line y = intercept + slope * x to every column of arr at once,
+    ignoring nan values
+
+    Parameters:
+    arr: number of rows x P ndarray, the x value of each row is first_x + its row index
+    first_x: x value of the first row (e.g. the puzzle number of the first row of a view)
+
+    Returns:
+    dict of length P ndarrays (see ols_from_sums)
+    '''
+    present = ~np.isnan(arr)
+    center = first_x + (len(arr) - 1) / 2
+    x = np.arange(len(arr))[:,None] + first_x - center
+    y = np.where(present, arr, 0)
+
+    fit = ols_from_sums(present.sum(axis=0),
+                        (present * x).sum(axis=0),
+                        y.sum(axis=0),
+                        (present * x**2).sum(axis=0),
+                        (x * y).sum(axis=0),
+                        (y**2).sum(axis=0))
+
+    # Move the intercept back from the centered x to x = 0
+    fit['Intercept'] = fit['Intercept'] - fit['Slope'] * center
+    fit['Intercept standard error'] = np.sqrt(fit['Intercept standard error']**2
+                                              + center**2 * fit['Slope standard error']**2
+                                              - 2 * center * fit['Covariance'])
+    del fit['Covariance']
+    return fit
+
+def rolling_linear_fit(arr, window):
+    '''
+    Fits a least squares line to the window rows ending at each row of each column of arr,
+    ignoring nan values. The sums for every window come from cumulative sums.
+
+    Parameters:
+    arr: number of rows x P ndarray, the row index is the x value
+    window (int): number of rows in each window
+
+    Returns:
+    dict of number of rows x P ndarrays (see ols_from_sums), nan where the window
+    has fewer than 3 values. Intercepts are for x centered on the window's last row
+    '''
+    present = ~np.isnan(arr)
+    x = np.arange(len(arr))[:,None]
+    y = np.where(present, arr, 0)
+
+    def window_sums(values):
+        # Sum of values over the window ending at each row
+        cumsum = np.cumsum(values, axis=0, dtype=float)
+        cumsum[window:] = cumsum[window:] - cumsum[:-window]
+        return cumsum
+
+    # Sums around x = the window's last row, which keeps them small
+    n = window_sums(present)
+    sum_x = window_sums(present * x) - n * x
+    sum_xx = window_sums(present * x**2) - 2 * x * window_sums(present * x) + n * x**2
+    sum_xy = window_sums(x * y) - x * window_sums(y)
+
+    fit = ols_from_sums(n, sum_x, window_sums(y), sum_xx, sum_xy, window_sums(y**2))
+    del fit['Covariance']
+    for key in fit:
+        if key != 'Puzzles attempted':
+            fit[key][n < 3] = np.nan
+    return fit
+
+def ols_from_sums(n, sum_x, sum_y, sum_xx, sum_xy, sum_yy):
+    '''
+    Calculates ordinary least squares fits of y = intercept + slope * x from sums over the
+    data points (all arguments are arrays of the same shape, one element per fit)
+
+    Returns:
+    dict with Slope, Intercept, their standard errors, the two-sided p-value of the slope
+    (t-test with n-2 degrees of freedom), Puzzles attempted (n) and Covariance of slope and intercept
+    '''
+    from scipy.stats import t as student_t
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean_x = sum_x / n
+        mean_y = sum_y / n
+        ss_x = sum_xx - sum_x * mean_x
+        slope = (sum_xy - sum_x * mean_y) / ss_x
+        intercept = mean_y - slope * mean_x
+
+        # Residual variance and standard errors
+        ss_res = np.maximum(sum_yy - sum_y * mean_y - slope * (sum_xy - sum_x * mean_y), 0)
+        dof = n - 2
+        res_var = np.where(dof > 0, ss_res / dof, np.nan)
+        se_slope = np.sqrt(res_var / ss_x)
+        se_intercept = np.sqrt(res_var * (1 / n + mean_x**2 / ss_x))
+
+        t = slope / se_slope
+        p = 2 * student_t.sf(np.abs(t), dof)
+
+    # A perfect fit is significant if the line has a slope, constant scores have no p-value
+    p = np.where(se_slope == 0, np.where(slope != 0, 0.0, np.nan), p)
+
+    return {'Slope': slope,
+            'Intercept': intercept,
+            'Slope standard error': se_slope,
+            'Intercept standard error': se_intercept,
+            'P-value': p,
+            'Puzzles attempted': n,
+            'Covariance': -mean_x * res_var / ss_x}
+
+def pattern_codes(packed):
+    '''
+    Converts packed grids to the base-4 pattern code of each row (see PatternIndex)
+
+    Parameters:
+    packed: uint64 ndarray of N grids made by pack_grids
+
+    Returns:
+    6xN uint16 ndarray of pattern codes
+    '''
+    packed = np.asarray(packed, dtype=np.uint64)
+    rows = (packed[None,:] >> ROW_SHIFTS[:,None]) & np.uint64(SOLVED_ROW)
+    return PACKED_ROW_TO_CODE[rows.astype(np.intp)]
+
+def decode_pattern_codes(codes):
+    '''Converts base-4 pattern codes to a number of codes x 5 ndarray of ints 0-3'''
+    return (np.asarray(codes)[:,None] >> np.array([8,6,4,2,0])) & 3
+
+def decode_grids(guesses_list):
+    '''
+    Converts Wordle result strings to int representation in one vectorized pass
+
+    Parameters:
+    guesses_list: list of N Wordle result strings (the colored boxes, any other
+                  characters such as newlines or quote marks are ignored)
+
+    Returns:
+    grids: 6x5xN uint8 ndarray of guesses where
+        0 = space filler for unused guesses
+        1 = gray box (wrong letter, not in word) = 11036
+        2 = yellow box (wrong letter, but is in word) = 129000
+        3 = green box (right letter) = 129001
+    valid: boolean ndarray of length N, False for malformed results (no boxes, more
+           than 30 boxes, or more boxes after a solved row, e.g. two results run
+           together). Malformed results are left as all 0s in grids.
+    '''
+    num_puzzles = len(guesses_list)
+    grids = np.zeros([num_puzzles,30], dtype='uint8')
+    if num_puzzles == 0:
+        return grids.reshape(0,6,5).transpose(1,2,0), np.zeros(0, dtype=bool)
+
+    # Read all characters as an array of unicode code points
+    lengths = np.fromiter(map(len, guesses_list), dtype=np.int64, count=num_puzzles)
+    codes = np.frombuffer(''.join(guesses_list).encode('utf-32-le'), dtype='<u4')
+
+    # Translate code points to ints, anything that isn't a box becomes 0
+    box_codes = np.searchsorted(BOX_CODE_POINTS, codes)
+    box_codes[box_codes == len(BOX_CODE_POINTS)] = 0
+    is_box = BOX_CODE_POINTS[box_codes] == codes
+    values = np.where(is_box, box_codes + 1, 0).astype('uint8')
+
+    # Position of each box within its own puzzle
+    puzzle_idx = np.repeat(np.arange(num_puzzles), lengths)[is_box]
+    values = values[is_box]
+    num_boxes = np.bincount(puzzle_idx, minlength=num_puzzles)
+    first_box = np.cumsum(num_boxes) - num_boxes
+    box_pos = np.arange(len(values)) - first_box[puzzle_idx]
+
+    # Check that each result fits in the 6x5 grid
+    valid = (num_boxes >= 1) & (num_boxes <= 30)
+    keep = valid[puzzle_idx]
+    grids[puzzle_idx[keep], box_pos[keep]] = values[keep]
+
+    # Nothing can follow a solved (all green) row
+    row_solved = np.all(grids.reshape(num_puzzles,6,5) == 3, axis=2)
+    first_solved = np.where(row_solved.any(axis=1), row_solved.argmax(axis=1), 5)
+    valid &= num_boxes <= (first_solved + 1) * 5
+    grids[~valid] = 0
+
+    return grids.reshape(num_puzzles,6,5).transpose(1,2,0), valid
+
+
+def main(argv=None):
+    '''
+    Command line tool for quick queries of a store file (see PuzzleStore.save). It only
+    uses numpy, so it starts without waiting for pandas or scipy.
+
+    Usage:
+    python -m wordlemodule [--store STORE_DIR] [--json] [--start START] [--end END] [leaderboard]
+    python -m wordlemodule [--store STORE_DIR] [--json] [--start START] [--end END] player NAME
+    python -m wordlemodule [--store STORE_DIR] [--json] players
+    '''
+    parser = argparse.ArgumentParser(prog='python -m wordlemodule', description='Quick queries of Wordle results')
+    parser.add_argument('--store', default=STORE_DIR, help=f'store file (default: {STORE_DIR})')
+    parser.add_argument('--json', action='store_true', help='print the results as JSON')
+    parser.add_argument('--start', help='only include puzzles from this puzzle number or date (e.g. 2023-01-01)')
+    parser.add_argument('--end', help='only include puzzles before this puzzle number or date')
+    commands = parser.add_subparsers(dest='command')
+    commands.add_parser('leaderboard', help="every player's mean solve score, standard deviation, puzzles attempted and current streak (the default)")
+    player_parser = commands.add_parser('player', help="one player's summary, score distribution and weekday means")
+    player_parser.add_argument('name')
+    commands.add_parser('players', help='list the player names')
+    args = parser.parse_args(argv)
+
+    data = WordleData(args.store)
+    if args.start is not None or args.end is not None:
+        try:
+            data = data.between(*[None if value is None else int(value) if value.isdigit() else value
+                                  for value in (args.start, args.end)])
+        except ValueError as error:
+            parser.error(str(error))
+    live = data.live()
+    latest = data.MAX_PUZZ_NUM - 1
+
+    def summary(player):
+        return {'Person': data.players[player],
+                'Mean solve score': round(float(live.average()[player]), 3),
+                'Solve score standard deviation': round(float(live.std()[player]), 3),
+                'Puzzles attempted': int(live.count[player]),
+                'Current streak': int(live.current_streak(latest)[player])}
+
+    if args.command == 'players':
+        results = data.players
+    elif args.command == 'player':
+        if args.name not in data.players:
+            parser.error(f'unknown player {args.name!r}, see the players command')
+        player = data.players.index(args.name)
+        scores = data.data_arr[:, player]
+        counts = np.bincount(scores[~np.isnan(scores)].astype(np.int64), minlength=8)
+        with np.errstate(invalid='ignore'):
+            weekday_mean = np.where(live.weekday_n[:, player] > 0, live.weekday_mean[:, player], np.nan)
+        results = dict(summary(player),
+                       **{'Score counts': {str(score) if score < 7 else 'X': int(counts[score]) for score in range(1, 8)},
+                          'Weekday mean solve score': {day: None if np.isnan(mean) else round(float(mean), 3)
+                                                       for day, mean in zip(WEEKDAYS, weekday_mean)}})
+    else:
+        # Players with no puzzles (nan mean) are sorted last
+        order = np.argsort(live.average(), kind='stable')
+        results = [summary(player) for player in order]
+
+    if args.json:
+        print(json.dumps(results, indent=4, ensure_ascii=False))
+    elif args.command == 'players':
+        print('\n'.join(results))
+    elif args.command == 'player':
+        for key, value in results.items():
+            if isinstance(value, dict):
+                value = '  '.join(f'{label}: {count}' for label, count in value.items())
+            print(f'{key}: {value}')
+    else:
+        width = max([len('Person')] + [len(row['Person']) for row in results])
+        print(f"{'Person':<{width}}  {'Mean':>6}  {'Std':>6}  {'Played':>6}  {'Streak':>6}")
+        for row in results:
+            print(f"{row['Person']:<{width}}  {row['Mean solve score']:>6.3f}  {row['Solve score standard deviation']:>6.3f}  "
+                  f"{row['Puzzles attempted']:>6}  {row['Current streak']:>6}")
+
+
+if __name__ == '__main__':
+    main()